@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, UserProfile, Recipe
+from .models import CustomUser, UserProfile, Recipe, UserNotificationSettings
 
 
 @admin.register(CustomUser)
@@ -21,6 +21,17 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 
+@admin.register(UserNotificationSettings)
+class UserNotificationSettingsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'is_subscribed', 'morning_reminder_time',
+                    'evening_reminder_time', 'timezone', 'next_morning_at', 'next_evening_at')
+    list_filter = ('is_subscribed', 'send_morning_reminder', 'send_evening_reminder', 'timezone')
+    search_fields = ('user__username',)
+    list_select_related = ('user',)
+    # Пересчитываются задачей напоминаний после смены времени или пояса
+    readonly_fields = ('next_morning_at', 'next_evening_at')
+
+
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ['name', 'meal_type', 'calories', 'protein',
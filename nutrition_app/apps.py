@@ -5,3 +5,9 @@ class NutritionAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'nutrition_app'
     verbose_name = "Рецепты правильного питания"
+
+    def ready(self):
+        # Подключает профилирование задач к сигналам Celery
+        from . import profiling  # noqa: F401
+        # Подключает замер SQL к каждому новому соединению с БД
+        from . import middleware  # noqa: F401
@@ -1,6 +1,7 @@
+from zoneinfo import available_timezones
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from .models import CustomUser
+from .models import CustomUser, UserNotificationSettings
 
 
 class CustomUserCreationForm(UserCreationForm):
@@ -103,3 +104,30 @@ class UserProfileForm(forms.ModelForm):
             'weight': 'Введите ваш вес в килограммах',
             'height': 'Введите ваш рост в сантиметрах',
         }
+
+
+def _timezone_choices():
+    return [(name, name) for name in sorted(available_timezones())]
+
+
+class NotificationScheduleForm(forms.ModelForm):
+    """Время напоминаний бота в Telegram и часовой пояс пользователя"""
+    timezone = forms.ChoiceField(
+        choices=_timezone_choices,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Часовой пояс'
+    )
+
+    class Meta:
+        model = UserNotificationSettings
+        fields = ('morning_reminder_time', 'evening_reminder_time', 'timezone')
+        widgets = {
+            'morning_reminder_time': forms.TimeInput(
+                attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
+            'evening_reminder_time': forms.TimeInput(
+                attrs={'class': 'form-control', 'type': 'time'}, format='%H:%M'),
+        }
+        labels = {
+            'morning_reminder_time': 'Утреннее напоминание',
+            'evening_reminder_time': 'Вечернее напоминание',
+        }
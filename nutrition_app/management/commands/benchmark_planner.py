@@ -0,0 +1,191 @@
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from nutrition_app.models import Recipe
+from nutrition_app.synthetic import bulk_insert, make_recipes, percentiles, temporary_database
+from nutrition_app.views import utils as planner
+
+# Суточные нормы, на которых гоняем планировщик (от похудения до набора массы)
+DAILY_CALORIES = (1400, 1800, 2200, 2600, 3000)
+
+# Цели приемов пищи для замера отдельных функций
+MEAL_TARGETS = {'breakfast': 500, 'lunch': 700, 'snack': 300, 'dinner': 500}
+
+def _kilobytes(value):
+    return 'n/a' if value is None else f'{value:.0f} KB'
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the weekly meal planner on synthetic recipe catalogs of growing size '
+            '(temporary database) and write latency, query, memory and accuracy results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,10000,1000000',
+                            help='Comma-separated catalog sizes; the catalog grows between sizes')
+        parser.add_argument('--runs', type=int, default=20,
+                            help='Planner runs per catalog size')
+        parser.add_argument('--component-runs', type=int, default=200,
+                            help='Calls per component function per catalog size')
+        parser.add_argument('--time-budget', type=float, default=120,
+                            help='Seconds per benchmark and size; at least one run is always made')
+        parser.add_argument('--trace-memory-up-to', type=int, default=100000,
+                            help='Largest catalog on which a whole planner run is traced for peak '
+                                 'memory (tracemalloc slows it down about 7x)')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='planner_benchmark.json',
+                            help='Where to write JSON results')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        rng = random.Random(options['seed'])
+        results = []
+
+        # Без DEBUG: журнал запросов не копит гигантские INSERT каталога,
+        # CaptureQueriesContext включает его сам только на время замера
+        with temporary_database(), override_settings(DEBUG=False):
+            for size in sizes:
+                self.stdout.write(f'📚 Catalog of {size} recipes...')
+                started = time.perf_counter()
+                existing = Recipe.objects.count()
+                bulk_insert(Recipe, make_recipes(size - existing, rng, start=existing))
+                build_seconds = time.perf_counter() - started
+
+                # Планировщик выбирает рецепты через модуль random
+                random.seed(options['seed'])
+                result = {
+                    'catalog_size': size,
+                    'build_seconds': round(build_seconds, 3),
+                    'planner': self._benchmark_planner(options, size),
+                    'components': self._benchmark_components(options, rng),
+                }
+                results.append(result)
+                self._report(result)
+
+        report = {
+            'benchmark': 'generate_optimized_weekly_meal_plan',
+            'created_at': timezone.now().isoformat(),
+            'seed': options['seed'],
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
+
+    # ===== ЗАМЕРЫ =====
+
+    def _benchmark_planner(self, options, size):
+        timings, queries, errors = [], [], []
+        deadline = time.perf_counter() + options['time_budget']
+
+        for run in range(options['runs']):
+            if run and time.perf_counter() > deadline:
+                break
+            daily_calories = DAILY_CALORIES[run % len(DAILY_CALORIES)]
+
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                plan = planner.generate_optimized_weekly_meal_plan(daily_calories)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+
+            # Точность: насколько итог дня отличается от суточной нормы
+            errors.extend(
+                abs(day['total_calories'] - daily_calories) / daily_calories * 100
+                for day in plan.values()
+            )
+
+        return {
+            'runs': len(timings),
+            **percentiles(timings),
+            'queries_per_run': round(statistics.fmean(queries), 1),
+            'peak_memory_kb': self._peak_memory(
+                planner.generate_optimized_weekly_meal_plan, DAILY_CALORIES[0]
+            ) if size <= options['trace_memory_up_to'] else None,
+            'accuracy': {
+                'mean_error_pct': round(statistics.fmean(errors), 2),
+                'max_error_pct': round(max(errors), 2),
+                'days_within_5pct': round(
+                    sum(1 for error in errors if error <= 5) / len(errors) * 100, 1),
+            },
+        }
+
+    def _benchmark_components(self, options, rng):
+        meal_types = list(MEAL_TARGETS)
+        # id во временной базе идут подряд - выборка воспроизводима по seed
+        bounds = Recipe.objects.aggregate(first=Min('id'), last=Max('id'))
+        sample_ids = rng.sample(range(bounds['first'], bounds['last'] + 1), 4 * len(meal_types))
+        recipes = list(Recipe.objects.filter(id__in=sample_ids))
+
+        def select_recipe(call):
+            meal_type = meal_types[call % len(meal_types)]
+            planner._select_recipe_for_meal(meal_type, MEAL_TARGETS[meal_type])
+
+        def adjust_portion(call):
+            planner._adjust_portion(recipes[call % len(recipes)], rng.uniform(0.8, 2.0))
+
+        def smart_adjustment(call):
+            meals = [recipes[(call + offset) % len(recipes)] for offset in range(4)]
+            planner._smart_portion_adjustment(*meals, sum(MEAL_TARGETS.values()))
+
+        return {
+            '_select_recipe_for_meal': self._benchmark_function(select_recipe, options),
+            '_adjust_portion': self._benchmark_function(adjust_portion, options),
+            '_smart_portion_adjustment': self._benchmark_function(smart_adjustment, options),
+        }
+
+    def _benchmark_function(self, function, options):
+        timings, queries = [], []
+        deadline = time.perf_counter() + options['time_budget']
+
+        for call in range(options['component_runs']):
+            if call and time.perf_counter() > deadline:
+                break
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                function(call)
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+
+        return {
+            'calls': len(timings),
+            **percentiles(timings),
+            'queries_per_call': round(statistics.fmean(queries), 2),
+            'peak_memory_kb': self._peak_memory(function, 0),
+        }
+
+    def _peak_memory(self, function, argument):
+        """Пик выделенной памяти за один вызов; отдельным прогоном,
+        чтобы tracemalloc не искажал замеры времени"""
+        tracemalloc.start()
+        try:
+            function(argument)
+            return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        finally:
+            tracemalloc.stop()
+
+    def _report(self, result):
+        planner_result = result['planner']
+        accuracy = planner_result['accuracy']
+        self.stdout.write(
+            f"  planner: {planner_result['runs']} runs, p50 {planner_result['p50_ms']:.1f}ms, "
+            f"p99 {planner_result['p99_ms']:.1f}ms, {planner_result['queries_per_run']} queries, "
+            f"{_kilobytes(planner_result['peak_memory_kb'])} peak, "
+            f"error {accuracy['mean_error_pct']}% (max {accuracy['max_error_pct']}%), "
+            f"{accuracy['days_within_5pct']}% days within ±5%")
+
+        for name, component in result['components'].items():
+            self.stdout.write(
+                f"  {name}: p50 {component['p50_ms']:.3f}ms, p99 {component['p99_ms']:.3f}ms, "
+                f"{component['queries_per_call']} queries, {_kilobytes(component['peak_memory_kb'])} peak")
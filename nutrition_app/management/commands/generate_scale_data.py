@@ -0,0 +1,103 @@
+import random
+import time
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from nutrition_app.models import (
+    CustomUser, Recipe, TelegramUser, UserMealPlan, UserNotificationSettings, UserProfile)
+from nutrition_app.synthetic import (
+    TELEGRAM_ID_BASE, bulk_insert, make_meal_plans, make_notification_settings, make_profiles,
+    make_recipes, make_telegram_accounts, make_users)
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with deterministic synthetic data for load testing: users with '
+            'profiles, Telegram accounts, notification settings, meal plan history and recipes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--recipes', type=int, default=10000,
+                            help='Recipes added to the catalog')
+        parser.add_argument('--history-days', type=int, default=30,
+                            help='Days of meal plan history, ending today')
+        parser.add_argument('--history-share', type=float, default=0.1,
+                            help='Share of users who have meal plan history')
+        parser.add_argument('--telegram-share', type=float, default=0.8,
+                            help='Share of users with a linked Telegram account')
+        parser.add_argument('--prefix', default='scale_user',
+                            help='Username prefix of generated users')
+        parser.add_argument('--password', default='scale-password',
+                            help='Password of every generated user (for HTTP load tests)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Users generated and inserted per transaction')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if CustomUser.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Users "{prefix}_*" already exist: use a fresh database or another --prefix')
+
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        rows = 0
+
+        if options['recipes']:
+            existing = Recipe.objects.count()
+            with transaction.atomic():
+                rows += bulk_insert(Recipe, make_recipes(options['recipes'], rng, start=existing))
+            self.stdout.write(f"📚 {options['recipes']} recipes added")
+
+        recipe_ids = {
+            meal_type: list(
+                Recipe.objects.filter(meal_type=meal_type)
+                .order_by('id').values_list('id', flat=True))
+            for meal_type, _ in Recipe.MEAL_TYPES
+        }
+        if options['history_days'] and not all(recipe_ids.values()):
+            raise CommandError('Meal plan history needs recipes of every meal type: pass --recipes')
+
+        # Один хэш на всех: make_password занимает ~0.3с на пользователя
+        password = make_password(options['password'])
+        users = make_users(options['users'], rng, password, prefix)
+        today = timezone.localdate()
+        # telegram_id уникален: новые аккаунты нумеруем после уже существующих
+        telegram_base = max(
+            TELEGRAM_ID_BASE,
+            (TelegramUser.objects.aggregate(last=Max('telegram_id'))['last'] or 0) + 1)
+        done = 0
+
+        while batch := list(islice(users, options['batch_size'])):
+            # Пачка пользователей и все их строки - в одной транзакции
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(batch)
+                rows += len(batch)
+                rows += bulk_insert(UserProfile, make_profiles(batch))
+
+                numbers = [
+                    number for number in range(done, done + len(batch))
+                    if rng.random() < options['telegram_share']
+                ]
+                with_telegram = [batch[number - done] for number in numbers]
+                rows += bulk_insert(TelegramUser, make_telegram_accounts(
+                    with_telegram, numbers, telegram_base))
+                rows += bulk_insert(
+                    UserNotificationSettings, make_notification_settings(with_telegram, rng))
+
+                with_history = [
+                    user for user in batch if rng.random() < options['history_share']]
+                rows += bulk_insert(UserMealPlan, make_meal_plans(
+                    with_history, rng, recipe_ids, today, options['history_days']))
+
+            done += len(batch)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"👥 {done}/{options['users']} users, {rows} rows, "
+                f"{rows / elapsed:.0f} rows/s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {rows} rows in {time.perf_counter() - started:.1f}s '
+            f'(users "{prefix}_*", password "{options["password"]}")'))
@@ -0,0 +1,259 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+from django.core.management.base import BaseCommand, CommandError
+from nutrition_app.synthetic import percentiles
+
+DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+GOALS = ['loss', 'maintenance', 'gain']
+ACTIVITY_LEVELS = ['sedentary', 'light', 'moderate', 'high', 'extreme']
+
+RECIPE_LINK = re.compile(r'/recipe/(\d+)/')
+SERVER_TOTAL = re.compile(r'total;dur=([\d.]+)')
+
+# Сколько самых частых причин сорванных сценариев показывать
+FAILURE_REASONS = 5
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    """Редиректы не проходим сами: каждый шаг сценария - отдельный замер"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class FlowError(Exception):
+    """Шаг сценария вернул не то, что ждали: дальше идти бессмысленно"""
+
+
+class Stats:
+    """Замеры всех потоков по эндпоинтам"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.server_times = defaultdict(list)
+        self.errors = Counter()
+        self.statuses = defaultdict(Counter)
+        self.flows = Counter()
+        self.failures = Counter()
+
+    def record(self, endpoint, elapsed, status, ok, server_time=None):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            self.statuses[endpoint][status] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+            if server_time is not None:
+                self.server_times[endpoint].append(server_time)
+
+
+class Visitor:
+    """Один посетитель сайта: свои cookie сессии и CSRF"""
+
+    def __init__(self, base_url, timeout, stats):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.stats = stats
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+
+    def get(self, endpoint, path, expect=200):
+        return self._request(endpoint, path, None, expect)
+
+    def post(self, endpoint, path, data, expect=302):
+        # CSRF: токен из cookie в поле формы, Referer - для HTTPS
+        data = {**data, 'csrfmiddlewaretoken': self._csrf_token()}
+        return self._request(endpoint, path, data, expect)
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        raise FlowError('no csrftoken cookie: the form page did not set it')
+
+    def _request(self, endpoint, path, data, expect):
+        url = self.base_url + path
+        body = urlencode(data).encode() if data is not None else None
+        request = Request(url, body, headers={'Referer': url})
+
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, headers, content = response.status, response.headers, response.read()
+        except HTTPError as error:
+            # Сюда попадают и 302: редиректы мы не проходим
+            status, headers, content = error.code, error.headers, error.read()
+        except (URLError, OSError) as error:
+            self.stats.record(endpoint, time.perf_counter() - started, type(error).__name__, False)
+            raise FlowError(f'{endpoint}: {error}')
+        elapsed = time.perf_counter() - started
+
+        # Серверное время из Server-Timing (RequestTimingMiddleware)
+        server_time = SERVER_TOTAL.search(headers.get('Server-Timing', ''))
+        self.stats.record(
+            endpoint, elapsed, status, status == expect,
+            float(server_time.group(1)) / 1000 if server_time else None)
+
+        if status != expect:
+            raise FlowError(f'{endpoint}: HTTP {status}, expected {expect}')
+        return content.decode('utf-8', 'replace')
+
+
+# ===== СЦЕНАРИИ =====
+
+
+def anonymous_flow(visitor, rng, options):
+    """Расчет калорий -> план на неделю -> день -> рецепт"""
+    visitor.get('GET /calculate/', '/calculate/')
+    visitor.post('POST /calculate/', '/calculate/', {
+        'gender': rng.choice(('male', 'female')),
+        'age': rng.randint(18, 70),
+        'weight': rng.randint(50, 110),
+        'height': rng.randint(150, 200),
+        'activity': rng.choice(ACTIVITY_LEVELS),
+        'goal': rng.choice(GOALS),
+    })
+    visitor.get('GET /week-plan/', '/week-plan/')
+
+    day_page = visitor.get('GET /day/<day>/', f'/day/{rng.choice(DAYS)}/')
+    recipe_ids = RECIPE_LINK.findall(day_page)
+    if not recipe_ids:
+        raise FlowError('GET /day/<day>/: no recipe links (empty catalog?)')
+    visitor.get(
+        'GET /recipe/<id>/',
+        f'/recipe/{rng.choice(recipe_ids)}/?portions={rng.randint(1, 10)}')
+
+
+def authenticated_flow(visitor, rng, options):
+    """Вход пользователя из generate_scale_data -> план на неделю"""
+    visitor.get('GET /login/', '/login/')
+    visitor.post('POST /login/', '/login/', {
+        'username': f"{options['user_prefix']}_{rng.randrange(options['login_users'])}",
+        'password': options['password'],
+    })
+    visitor.get('GET /week-plan/ (logged in)', '/week-plan/')
+
+
+class Command(BaseCommand):
+    help = ('Load-test the web tier over HTTP with scripted user flows (anonymous planner flow '
+            'and logged-in week plan); reports throughput, latency percentiles and errors per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000',
+                            help='Running server to load (runserver, gunicorn, ...)')
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help='Visitors running flows at the same time (threads)')
+        parser.add_argument('--duration', type=float, default=30,
+                            help='Seconds to keep starting new flows')
+        parser.add_argument('--auth-share', type=float, default=0.3,
+                            help='Share of flows that log in instead of staying anonymous')
+        parser.add_argument('--user-prefix', default='scale_user',
+                            help='Username prefix of generate_scale_data users')
+        parser.add_argument('--login-users', type=int, default=1000,
+                            help='Log in as <prefix>_0 ... <prefix>_<N-1>')
+        parser.add_argument('--password', default='scale-password')
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Per-request timeout, seconds')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--json', dest='json_path',
+                            help='Also write results to this JSON file')
+
+    def handle(self, *args, **options):
+        if options['auth_share'] and options['login_users'] < 1:
+            raise CommandError('--login-users must be positive when --auth-share > 0')
+
+        stats = Stats()
+        deadline = time.monotonic() + options['duration']
+
+        self.stdout.write(
+            f"🚀 {options['concurrency']} visitors against {options['base_url']} "
+            f"for {options['duration']:.0f}s...")
+
+        threads = [
+            threading.Thread(
+                target=self._visitor_loop,
+                args=(random.Random(options['seed'] * 1000 + number), stats, deadline, options))
+            for number in range(options['concurrency'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        results = self._report(stats, elapsed)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"💾 Results written to {options['json_path']}")
+
+    def _visitor_loop(self, rng, stats, deadline, options):
+        while time.monotonic() < deadline:
+            # Каждый сценарий - новый посетитель с чистыми cookie
+            visitor = Visitor(options['base_url'], options['timeout'], stats)
+            if rng.random() < options['auth_share']:
+                flow, name = authenticated_flow, 'authenticated'
+            else:
+                flow, name = anonymous_flow, 'anonymous'
+
+            try:
+                flow(visitor, rng, options)
+                with stats.lock:
+                    stats.flows[name] += 1
+            except FlowError as error:
+                with stats.lock:
+                    stats.flows[f'{name} failed'] += 1
+                    stats.failures[str(error)] += 1
+
+    def _report(self, stats, elapsed):
+        endpoints = {}
+        self.stdout.write(
+            f"{'endpoint':<28}{'count':>7}{'errors':>8}{'req/s':>8}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'server p50':>12}")
+
+        for endpoint, latencies in sorted(stats.latencies.items()):
+            summary = percentiles(latencies)
+            server_p50 = percentiles(stats.server_times[endpoint])['p50_ms']
+            errors = stats.errors[endpoint]
+            endpoints[endpoint] = {
+                'count': len(latencies),
+                'errors': errors,
+                'error_rate': errors / len(latencies),
+                'requests_per_second': len(latencies) / elapsed,
+                'p50_ms': summary['p50_ms'], 'p90_ms': summary['p90_ms'], 'p99_ms': summary['p99_ms'],
+                'server_p50_ms': server_p50,
+                'statuses': {str(status): count for status, count in stats.statuses[endpoint].items()},
+            }
+            self.stdout.write(
+                f"{endpoint:<28}{len(latencies):>7}{errors:>8}{len(latencies) / elapsed:>8.1f}"
+                f"{summary['p50_ms']:>9.1f}{summary['p90_ms']:>9.1f}{summary['p99_ms']:>9.1f}"
+                f"{server_p50:>12.1f}")
+
+        requests = sum(len(latencies) for latencies in stats.latencies.values())
+        errors = sum(stats.errors.values())
+        flows = ', '.join(f'{name}: {count}' for name, count in sorted(stats.flows.items()))
+        style = self.style.SUCCESS if not errors else self.style.WARNING
+        self.stdout.write(style(
+            f'📊 {requests} requests in {elapsed:.1f}s ({requests / elapsed:.1f} req/s), '
+            f'{errors} errors; flows - {flows}'))
+        for reason, count in stats.failures.most_common(FAILURE_REASONS):
+            self.stdout.write(f'  ❌ {count} x {reason}')
+
+        return {
+            'elapsed_seconds': elapsed,
+            'requests': requests,
+            'errors': errors,
+            'requests_per_second': requests / elapsed,
+            'flows': dict(stats.flows),
+            'failures': dict(stats.failures.most_common(FAILURE_REASONS)),
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,49 @@
+import io
+import os
+import pstats
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Summarize the hottest functions across sampled cProfile dumps in PROFILING_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            help='Views, tasks or functions to report (default: all)')
+        parser.add_argument('--dir', default=settings.PROFILING_DIR,
+                            help='Directory with profile dumps')
+        parser.add_argument('--sort', choices=('cumulative', 'tottime', 'ncalls'),
+                            default='cumulative', help='Sort key for the function table')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Functions shown per name')
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        if not os.path.isdir(directory):
+            raise CommandError(f'No profiles in {directory}: set PROFILING_SAMPLE_RATE or PROFILING_TOKEN')
+
+        names = options['names'] or sorted(os.listdir(directory))
+        for name in names:
+            path = os.path.join(directory, name)
+            dumps = sorted(
+                os.path.join(path, file_name)
+                for file_name in (os.listdir(path) if os.path.isdir(path) else [])
+                if file_name.endswith('.prof')
+            )
+            if not dumps:
+                self.stdout.write(self.style.WARNING(f'⚠️ {name}: no profiles'))
+                continue
+
+            # Все профили одного имени складываются в одну таблицу
+            table = io.StringIO()
+            stats = pstats.Stats(dumps[0], stream=table)
+            for dump in dumps[1:]:
+                stats.add(dump)
+            # Без списка файлов: при сотнях профилей он занял бы весь вывод
+            stats.files = []
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+
+            self.stdout.write(self.style.SUCCESS(
+                f'📊 {name}: {len(dumps)} profiles, {stats.total_tt:.3f}s total'))
+            self.stdout.write(table.getvalue(), ending='')
@@ -0,0 +1,178 @@
+"""Замер времени запросов: общее время, время и число SQL-запросов,
+время отрисовки шаблонов.
+
+Итоги уходят в заголовок Server-Timing (видно во вкладке Network браузера),
+а запросы дольше SLOW_REQUEST_THRESHOLD - в лог медленных запросов
+вместе с самыми частыми SQL (так видны N+1 и тяжелые расчеты плана).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger('nutrition_app.slow_requests')
+
+# Длинный список колонок в SELECT прячет главное - FROM и WHERE
+SELECT_COLUMNS = re.compile(r'^SELECT .*? FROM ', re.DOTALL)
+
+# Замер текущего запроса; у каждой задачи asyncio свой, а asgiref переносит
+# его в поток sync_to_async, где под ASGI выполняется синхронная view
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Накопленные за запрос замеры"""
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.queries = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        """Замер одного SQL (через _timed_execute): время и текст"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries[sql] += 1
+
+
+# ===== SQL =====
+
+
+def _timed_execute(execute, sql, params, many, context):
+    """Обертка SQL на всех соединениях: пишет в замер текущего запроса, если он идет"""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install_timed_execute(sender, connection, **kwargs):
+    """Ставит _timed_execute на каждое новое соединение.
+
+    Соединения у каждого потока свои, поэтому обертка на соединениях потока
+    middleware не видела бы запросов view, которую ASGI выполняет в потоке
+    sync_to_async. Ставим первой в список: connection.execute_wrapper()
+    снимает при выходе последнюю обертку.
+    """
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _timed_execute)
+
+
+# ===== ШАБЛОНЫ =====
+
+
+class TimedTemplate(Template):
+    """Шаблон, который добавляет время отрисовки к замеру запроса.
+
+    Считаем только шаблоны верхнего уровня: {% include %} отрисовывается
+    внутри них движком напрямую и уже попадает в их время.
+    """
+
+    def render(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return super().render(context, request)
+
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django (TEMPLATES['BACKEND']) с замером времени отрисовки"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+# ===== MIDDLEWARE =====
+
+
+@contextmanager
+def _measuring():
+    """Замер SQL и шаблонов на время блока; отдает RequestTiming"""
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+class RequestTimingMiddleware:
+    """Server-Timing для каждого ответа и лог медленных запросов.
+
+    Работает и в синхронном (WSGI), и в асинхронном (ASGI) стеке,
+    чтобы не заставлять Django переключать контекст ради замера.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started = time.perf_counter()
+        with _measuring() as timing:
+            response = self.get_response(request)
+        return _finish(request, response, time.perf_counter() - started, timing)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with _measuring() as timing:
+            response = await self.get_response(request)
+        return _finish(request, response, time.perf_counter() - started, timing)
+
+
+def _finish(request, response, total, timing):
+    response['Server-Timing'] = (
+        f'total;dur={total * 1000:.1f}, '
+        f'db;dur={timing.db_time * 1000:.1f};desc="{timing.query_count} queries", '
+        f'tpl;dur={timing.template_time * 1000:.1f}'
+    )
+
+    if total >= settings.SLOW_REQUEST_THRESHOLD:
+        _log_slow_request(request, response, total, timing)
+
+    return response
+
+
+def _log_slow_request(request, response, total, timing):
+    lines = [
+        f'{request.method} {request.get_full_path()} -> {response.status_code} '
+        f'in {total * 1000:.0f}ms: db {timing.db_time * 1000:.0f}ms '
+        f'({timing.query_count} queries), templates {timing.template_time * 1000:.0f}ms'
+    ]
+
+    for sql, count in timing.queries.most_common(settings.SLOW_REQUEST_TOP_QUERIES):
+        if count < 2:
+            break
+        lines.append(f"  {count}x {SELECT_COLUMNS.sub('SELECT ... FROM ', sql)[:300]}")
+
+    logger.warning('\n'.join(lines))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition_app', '0005_usernotificationsettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usernotificationsettings',
+            name='next_evening_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующее вечернее напоминание'),
+        ),
+        migrations.AddField(
+            model_name='usernotificationsettings',
+            name='next_morning_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующее утреннее напоминание'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:27
+
+import datetime
+import nutrition_app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition_app', '0006_usernotificationsettings_next_reminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usernotificationsettings',
+            name='evening_reminder_time',
+            field=models.TimeField(default=datetime.time(20, 0), verbose_name='Время вечернего напоминания'),
+        ),
+        migrations.AddField(
+            model_name='usernotificationsettings',
+            name='morning_reminder_time',
+            field=models.TimeField(default=datetime.time(8, 0), verbose_name='Время утреннего напоминания'),
+        ),
+        migrations.AddField(
+            model_name='usernotificationsettings',
+            name='timezone',
+            field=models.CharField(default='Asia/Krasnoyarsk', max_length=64, validators=[nutrition_app.models.validate_timezone_name], verbose_name='Часовой пояс'),
+        ),
+    ]
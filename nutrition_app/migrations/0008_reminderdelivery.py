@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:28
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition_app', '0007_usernotificationsettings_reminder_times'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reminder_type', models.CharField(choices=[('morning', 'Утреннее'), ('evening', 'Вечернее')], max_length=10, verbose_name='Тип напоминания')),
+                ('slot', models.DateTimeField(verbose_name='Слот напоминания')),
+                ('claim_token', models.UUIDField(db_index=True, default=uuid.uuid4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminder_deliveries', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Отправленное напоминание',
+                'verbose_name_plural': 'Отправленные напоминания',
+                'constraints': [models.UniqueConstraint(fields=('user', 'reminder_type', 'slot'), name='unique_reminder_delivery')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition_app', '0008_reminderdelivery'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reminderdelivery',
+            name='reminder_type',
+            field=models.CharField(choices=[('morning', 'Утреннее'), ('evening', 'Вечернее'), ('weekly', 'Недельный отчет')], max_length=10, verbose_name='Тип напоминания'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+import uuid
+from datetime import time
 from tabnanny import verbose
+from zoneinfo import available_timezones
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
@@ -157,6 +161,12 @@ class UserMealPlan(models.Model):
         ordering = ['date', 'meal_type']
 
 
+def validate_timezone_name(value):
+    """Проверка, что часовой пояс есть в базе IANA"""
+    if value not in available_timezones():
+        raise ValidationError(f"Неизвестный часовой пояс: {value}")
+
+
 class UserNotificationSettings(models.Model):
     """Настройки уведомлений пользователя"""
     user = models.OneToOneField(
@@ -169,18 +179,89 @@ class UserNotificationSettings(models.Model):
     is_subscribed = models.BooleanField(
         default=True, verbose_name="Подписка на уведомления")
 
-    # Время уведомлений (будем использовать фиксированное для простоты)
     send_morning_reminder = models.BooleanField(
         default=True, verbose_name="Утренние напоминания")
     send_evening_reminder = models.BooleanField(
         default=True, verbose_name="Вечерние напоминания")
 
+    # Время уведомлений - локальное время пользователя в его часовом поясе
+    morning_reminder_time = models.TimeField(
+        default=time(8, 0), verbose_name="Время утреннего напоминания")
+    evening_reminder_time = models.TimeField(
+        default=time(20, 0), verbose_name="Время вечернего напоминания")
+    timezone = models.CharField(
+        max_length=64, default=settings.TIME_ZONE, validators=[validate_timezone_name],
+        verbose_name="Часовой пояс")
+
+    # Ближайшее время отправки (UTC, с точностью до минуты):
+    # задача выбирает по индексу только наступившие
+    next_morning_at = models.DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name="Следующее утреннее напоминание")
+    next_evening_at = models.DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name="Следующее вечернее напоминание")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Настройки уведомлений {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule = instance._schedule_key()
+        return instance
+
+    def _schedule_key(self):
+        return tuple(
+            self.__dict__.get(field)
+            for field in ('morning_reminder_time', 'evening_reminder_time', 'timezone')
+        )
+
+    def save(self, *args, **kwargs):
+        # Изменилось время или часовой пояс - расписание пересчитает задача напоминаний
+        if self._schedule_key() != getattr(self, '_loaded_schedule', None):
+            self.next_morning_at = None
+            self.next_evening_at = None
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'next_morning_at', 'next_evening_at'}
+
+        super().save(*args, **kwargs)
+        self._loaded_schedule = self._schedule_key()
+
     class Meta:
         verbose_name = "Настройка уведомлений"
         verbose_name_plural = "Настройки уведомлений"
+
+
+class ReminderDelivery(models.Model):
+    """Журнал отправленных напоминаний: не больше одного на пользователя, тип и слот"""
+    REMINDER_TYPES = [
+        ('morning', 'Утреннее'),
+        ('evening', 'Вечернее'),
+        ('weekly', 'Недельный отчет'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name='reminder_deliveries', verbose_name="Пользователь")
+    reminder_type = models.CharField(
+        max_length=10, choices=REMINDER_TYPES, verbose_name="Тип напоминания")
+    slot = models.DateTimeField(verbose_name="Слот напоминания")
+    # Метка тика, записавшего строку: по ней тик узнает, какие слоты достались ему
+    claim_token = models.UUIDField(default=uuid.uuid4, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_reminder_type_display()} - {self.slot}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'reminder_type', 'slot'], name='unique_reminder_delivery'),
+        ]
+        verbose_name = "Отправленное напоминание"
+        verbose_name_plural = "Отправленные напоминания"
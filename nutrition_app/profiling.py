@@ -0,0 +1,180 @@
+"""Выборочное профилирование представлений и задач Celery через cProfile.
+
+Включается без передеплоя, переменными окружения:
+PROFILING_SAMPLE_RATE=N - профилируем каждый N-й запрос к сайту и каждый
+N-й запуск каждой задачи; PROFILING_TOKEN - запрос с заголовком
+X-Profile: <токен> профилируется всегда.
+
+Профили (.prof, формат pstats) складываются в PROFILING_DIR/<имя>/, где
+имя - view_name представления, имя задачи или функции. Сводку по ним
+печатает команда profile_report.
+"""
+import cProfile
+import hmac
+import itertools
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+# Счетчики вызовов для выборки "каждый N-й" - по имени представления или задачи
+_counters = defaultdict(itertools.count)
+_counters_lock = threading.Lock()
+
+# Профилировщики запущенных задач Celery: task_id -> (имя, профилировщик)
+_task_profilers = {}
+
+# Номер профиля в процессе - чтобы быстрые вызовы не затирали файлы друг друга
+_dumps = itertools.count()
+
+# Активный профилировщик потока: второй cProfile поверх первого сбил бы оба
+_local = threading.local()
+
+
+def _active():
+    return getattr(_local, 'active', False)
+
+
+def sample(name):
+    """Пора ли профилировать очередной вызов name (1 из PROFILING_SAMPLE_RATE)"""
+    rate = settings.PROFILING_SAMPLE_RATE
+    if not rate or _active():
+        return False
+    with _counters_lock:
+        return next(_counters[name]) % rate == 0
+
+
+def start():
+    profiler = cProfile.Profile()
+    _local.active = True
+    profiler.enable()
+    return profiler
+
+
+def stop(profiler, name):
+    """Останавливает профилировщик и сохраняет профиль в PROFILING_DIR/<name>/"""
+    profiler.disable()
+    _local.active = False
+
+    directory = os.path.join(settings.PROFILING_DIR, re.sub(r'[^\w.-]+', '_', name))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(
+        directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{next(_dumps)}.prof')
+    profiler.dump_stats(path)
+    return path
+
+
+@contextmanager
+def profile(name):
+    """Профилирует блок, если он попал в выборку"""
+    if not sample(name):
+        yield
+        return
+
+    profiler = start()
+    try:
+        yield
+    finally:
+        stop(profiler, name)
+
+
+def profiled(func):
+    """Декоратор: выборочно профилировать функцию под ее полным именем"""
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+# ===== ПРЕДСТАВЛЕНИЯ =====
+
+
+class ProfilingMiddleware:
+    """Профилирует каждый N-й запрос и запросы с заголовком X-Profile.
+
+    При выключенном профилировании (нет ни PROFILING_SAMPLE_RATE, ни
+    PROFILING_TOKEN) Django убирает middleware из цепочки целиком.
+
+    cProfile видит только свой поток. В асинхронном стеке синхронная view
+    выполняется в потоке sync_to_async запроса, поэтому профилировщик
+    включается и выключается в нем же; асинхронные view (вебхук бота)
+    идут в event loop и в такой профиль не попадают.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_SAMPLE_RATE and not settings.PROFILING_TOKEN:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not _wanted(request):
+            return self.get_response(request)
+
+        profiler = start()
+        try:
+            return self.get_response(request)
+        finally:
+            _stop_request(profiler, request)
+
+    async def __acall__(self, request):
+        if not _wanted(request):
+            return await self.get_response(request)
+
+        profiler = await sync_to_async(start, thread_sensitive=True)()
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(_stop_request, thread_sensitive=True)(profiler, request)
+
+
+def _wanted(request):
+    """Профилировать ли запрос: заголовок X-Profile или очередь выборки"""
+    token = settings.PROFILING_TOKEN
+    forced = bool(token) and hmac.compare_digest(
+        request.headers.get('X-Profile', '').encode(), token.encode())
+
+    # Имя представления узнаем только после разбора URL, поэтому
+    # выборка для сайта общая, а не по каждому представлению
+    return not _active() and (forced or sample('views'))
+
+
+def _stop_request(profiler, request):
+    match = request.resolver_match
+    stop(profiler, match.view_name if match else 'unresolved')
+
+
+# ===== ЗАДАЧИ CELERY =====
+
+
+@task_prerun.connect
+def _start_task_profile(task_id=None, task=None, **kwargs):
+    if sample(task.name):
+        _task_profilers[task_id] = (task.name, start())
+
+
+@task_postrun.connect
+def _stop_task_profile(task_id=None, **kwargs):
+    started = _task_profilers.pop(task_id, None)
+    if started:
+        name, profiler = started
+        stop(profiler, name)
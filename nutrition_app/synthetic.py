@@ -0,0 +1,238 @@
+"""Синтетические данные для бенчмарков и нагрузочных прогонов.
+
+Все генераторы детерминированы: одинаковый random.Random(seed) дает
+одинаковые строки. Объекты выдаются потоком, а bulk_insert пишет их
+пачками, так что миллион строк не держится в памяти целиком.
+"""
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import time, timedelta
+from decimal import Decimal
+from itertools import islice
+from django.db import connection
+from .models import (
+    CustomUser, Recipe, TelegramUser, UserMealPlan, UserNotificationSettings, UserProfile)
+from .views.utils import calculate_user_calories
+
+# Доли приемов пищи в каталоге и калорийность блюда: (среднее, разброс)
+MEAL_TYPE_WEIGHTS = {'breakfast': 25, 'lunch': 30, 'snack': 15, 'dinner': 30}
+MEAL_CALORIES = {
+    'breakfast': (420, 120),
+    'lunch': (620, 170),
+    'snack': (220, 80),
+    'dinner': (560, 160),
+}
+MIN_CALORIES = 50
+MAX_CALORIES = 1500
+
+# Ингредиенты: (название, единица, мин., макс.). Без единицы - "по вкусу",
+# такие строки _parse_ingredient_amount оставляет как есть
+INGREDIENTS = {
+    'breakfast': [
+        ('Овсяные хлопья', 'г', 40, 90), ('Молоко', 'мл', 100, 300), ('Яйцо', 'шт', 1, 3),
+        ('Творог', 'г', 100, 250), ('Банан', 'шт', 1, 2), ('Мед', 'ч.л', 1, 2),
+        ('Хлеб цельнозерновой', 'г', 30, 80), ('Сыр', 'г', 20, 50), ('Ягоды', 'г', 50, 150),
+    ],
+    'lunch': [
+        ('Куриное филе', 'г', 120, 250), ('Рис', 'г', 60, 120), ('Гречка', 'г', 60, 120),
+        ('Говядина', 'г', 120, 220), ('Картофель', 'г', 150, 300), ('Морковь', 'шт', 1, 2),
+        ('Лук', 'шт', 1, 1), ('Оливковое масло', 'ст.л', 1, 2), ('Чеснок', 'зубч', 1, 3),
+    ],
+    'snack': [
+        ('Йогурт', 'г', 100, 200), ('Орехи', 'г', 15, 40), ('Яблоко', 'шт', 1, 2),
+        ('Кефир', 'мл', 150, 250), ('Хлебцы', 'шт', 2, 4), ('Сухофрукты', 'г', 20, 50),
+    ],
+    'dinner': [
+        ('Филе лосося', 'г', 120, 220), ('Индейка', 'г', 120, 220), ('Брокколи', 'г', 100, 250),
+        ('Кабачок', 'шт', 1, 2), ('Булгур', 'г', 50, 100), ('Сметана', 'ст.л', 1, 3),
+        ('Укроп', 'пучок', 1, 1), ('Помидор', 'шт', 1, 3), ('Соль', 'щепотка', 1, 1),
+    ],
+}
+SEASONINGS = ['Соль по вкусу', 'Перец по вкусу', 'Зелень по вкусу']
+
+INSERT_BATCH_SIZE = 5000
+
+# Пользователи: антропометрия по полу (среднее, разброс) и доли целей и активности
+BODY = {'male': {'weight': (84, 13), 'height': (178, 7)},
+        'female': {'weight': (67, 12), 'height': (165, 6)}}
+GOALS = [('loss', 45), ('maintenance', 35), ('gain', 20)]
+ACTIVITY_LEVELS = [('sedentary', 30), ('light', 30), ('moderate', 25), ('high', 12), ('extreme', 3)]
+
+# Часовые пояса и время напоминаний: рассылка размазана, а не в одну минуту
+TIMEZONES = ['Europe/Moscow', 'Europe/Moscow', 'Europe/Samara', 'Asia/Yekaterinburg',
+             'Asia/Novosibirsk', 'Asia/Krasnoyarsk', 'Asia/Irkutsk', 'Asia/Vladivostok']
+MORNING_TIMES = [time(hour, minute) for hour in range(6, 10) for minute in (0, 15, 30, 45)]
+EVENING_TIMES = [time(hour, minute) for hour in range(19, 23) for minute in (0, 30)]
+PORTION_MULTIPLIERS = [Decimal(value) for value in ('0.8', '1.0', '1.0', '1.0', '1.2', '1.5')]
+
+# Первый telegram_id синтетических пользователей (генератор данных, нагрузочные прогоны)
+TELEGRAM_ID_BASE = 5 * 10 ** 9
+
+# Перцентили в отчетах бенчмарков и нагрузочных прогонов
+PERCENTILES = (50, 90, 99)
+
+
+def make_recipes(count, rng, start=0):
+    """Поток из count рецептов с правдоподобными калориями и БЖУ"""
+    meal_types = list(MEAL_TYPE_WEIGHTS)
+    weights = list(MEAL_TYPE_WEIGHTS.values())
+
+    for number in range(start, start + count):
+        meal_type = rng.choices(meal_types, weights)[0]
+        mean, deviation = MEAL_CALORIES[meal_type]
+        calories = int(min(MAX_CALORIES, max(MIN_CALORIES, rng.gauss(mean, deviation))))
+
+        # Доли калорий из белков, жиров и углеводов; 4 и 9 ккал на грамм
+        protein_share = rng.uniform(0.15, 0.35)
+        fat_share = rng.uniform(0.2, 0.35)
+        carbs_share = 1 - protein_share - fat_share
+
+        yield Recipe(
+            name=f'{meal_type.capitalize()} #{number}',
+            meal_type=meal_type,
+            calories=calories,
+            protein=round(calories * protein_share / 4, 1),
+            fat=round(calories * fat_share / 9, 1),
+            carbs=round(calories * carbs_share / 4, 1),
+            ingredients=_ingredients_text(meal_type, rng),
+            instructions='Подготовить продукты.\nПриготовить.\nПодать.',
+            cooking_time=rng.choice((5, 10, 15, 20, 30, 45, 60)),
+            difficulty=rng.choice(('easy', 'easy', 'medium', 'hard')),
+        )
+
+
+def _ingredients_text(meal_type, rng):
+    """Строки в формате, который понимает _parse_ingredient_amount: "Рис - 80 г" """
+    lines = []
+    for name, unit, low, high in rng.sample(INGREDIENTS[meal_type], rng.randint(3, 6)):
+        lines.append(f'{name} - {rng.randint(low, high)} {unit}')
+    lines.append(rng.choice(SEASONINGS))
+    return '\n'.join(lines)
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def make_users(count, rng, password, prefix, start=0):
+    """Поток пользователей с правдоподобными ростом, весом, целью и активностью.
+
+    password - уже готовый хэш: make_password на каждого пользователя
+    занял бы больше времени, чем вся остальная генерация.
+    """
+    for number in range(start, start + count):
+        gender = rng.choice(('male', 'female'))
+        body = BODY[gender]
+        yield CustomUser(
+            username=f'{prefix}_{number}',
+            password=password,
+            first_name=f'User{number}',
+            gender=gender,
+            age=rng.randint(18, 70),
+            weight=round(max(40, rng.gauss(*body['weight'])), 1),
+            height=round(max(145, rng.gauss(*body['height'])), 1),
+            goal=_weighted(rng, GOALS),
+            activity_level=_weighted(rng, ACTIVITY_LEVELS),
+        )
+
+
+def make_profiles(users):
+    for user in users:
+        yield UserProfile(user=user, daily_calories=calculate_user_calories(user))
+
+
+def make_telegram_accounts(users, numbers, base=TELEGRAM_ID_BASE):
+    """Привязки Telegram; numbers - номера пользователей для стабильных telegram_id.
+
+    base - первый telegram_id: при повторной генерации в ту же базу
+    (с другим префиксом) его берут выше уже занятых id.
+    """
+    for user, number in zip(users, numbers):
+        yield TelegramUser(
+            user=user,
+            telegram_id=base + number,
+            chat_id=base + number,
+            first_name=user.first_name,
+        )
+
+
+def make_notification_settings(users, rng):
+    for user in users:
+        yield UserNotificationSettings(
+            user=user,
+            is_subscribed=rng.random() < 0.9,
+            send_morning_reminder=rng.random() < 0.85,
+            send_evening_reminder=rng.random() < 0.6,
+            morning_reminder_time=rng.choice(MORNING_TIMES),
+            evening_reminder_time=rng.choice(EVENING_TIMES),
+            timezone=rng.choice(TIMEZONES),
+        )
+
+
+def make_meal_plans(users, rng, recipe_ids, last_date, days):
+    """История планов питания за days дней до last_date включительно.
+
+    recipe_ids - {тип приема пищи: [id рецептов]}.
+    """
+    first_date = last_date - timedelta(days=days - 1)
+    for user in users:
+        for offset in range(days):
+            for meal_type, _ in Recipe.MEAL_TYPES:
+                yield UserMealPlan(
+                    user=user,
+                    date=first_date + timedelta(days=offset),
+                    meal_type=meal_type,
+                    recipe_id=rng.choice(recipe_ids[meal_type]),
+                    portion_multiplier=rng.choice(PORTION_MULTIPLIERS),
+                )
+
+
+def bulk_insert(model, objects, batch_size=INSERT_BATCH_SIZE):
+    """Пишет поток объектов пачками; возвращает число вставленных строк"""
+    inserted = 0
+    objects = iter(objects)
+    while batch := list(islice(objects, batch_size)):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        inserted += len(batch)
+    return inserted
+
+
+def percentiles(values):
+    """Сводка замеров в секундах: {'p50_ms', 'p90_ms', 'p99_ms', 'mean_ms'} в миллисекундах"""
+    if len(values) < 2:
+        cuts = values * 99 or [0] * 99
+    else:
+        cuts = statistics.quantiles(values, n=100, method='inclusive')
+    summary = {f'p{point}_ms': round(cuts[point - 1] * 1000, 3) for point in PERCENTILES}
+    summary['mean_ms'] = round(statistics.fmean(values) * 1000, 3) if values else 0
+    return summary
+
+
+@contextmanager
+def temporary_database():
+    """Временная база данных на время прогона (как у тестов Django).
+
+    SQLite создаем в файле, а не в памяти: потоки прогона пишут в базу
+    параллельно, а общая in-memory база блокирует таблицы целиком.
+    """
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    path = None
+
+    if connection.vendor == 'sqlite':
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        test_settings['NAME'] = path
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if path and os.path.exists(path):
+            os.remove(path)
@@ -1,3 +1,253 @@
-from django.test import TestCase
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import CustomUser, Recipe, UserMealPlan, UserNotificationSettings, UserProfile
+from .synthetic import bulk_insert, make_recipes
 
-# Create your tests here.
+# ===== БЮДЖЕТЫ ЗАПРОСОВ =====
+# Верхние границы числа SQL-запросов и времени (секунд) для страниц сайта,
+# помощников бота и задач. Поднять бюджет - осознанное решение, которое
+# должно быть видно на ревью, поэтому все числа собраны здесь.
+# Число запросов проверяется всегда, время - только с CHECK_TIME_BUDGETS=1:
+# на медленной или занятой машине CI оно плавает.
+# Страницы с планировщиком (генерация недели) заметно дороже остальных, и число
+# запросов у них зависит от случайного выбора: каждая лишняя попытка подобрать
+# день - еще 4 запроса, поэтому у них небольшой запас.
+QUERY_BUDGETS = {
+    # Сайт: анонимный пользователь
+    'calculate_calories': {'queries': 40, 'seconds': 3.0},
+    'week_plan_anonymous': {'queries': 29, 'seconds': 1.0},
+    'day_plan_anonymous': {'queries': 5, 'seconds': 0.5},
+    'recipe_detail': {'queries': 2, 'seconds': 0.5},
+    # Сайт: авторизованный пользователь
+    'week_plan': {'queries': 70, 'seconds': 3.0},
+    'day_plan': {'queries': 7, 'seconds': 0.5},
+    'dashboard': {'queries': 3, 'seconds': 0.5},
+    # Бот и Celery
+    'get_user_meal_plan_for_date': {'queries': 1, 'seconds': 0.2},
+    'generate_personal_menu_message': {'queries': 1, 'seconds': 0.2},
+    'generate_personal_menu_message_cached': {'queries': 0, 'seconds': 0.1},
+    # 60 пользователей; запросы растут только с числом пачек, а не пользователей
+    'check_all_reminders': {'queries': 11, 'seconds': 2.0},
+}
+
+CHECK_TIME_BUDGETS = os.getenv('CHECK_TIME_BUDGETS') == '1'
+
+# Размер каталога в тестах: достаточно, чтобы планировщик выбирал из сотен блюд
+CATALOG_SIZE = 400
+
+
+class QueryBudgetMixin:
+    """assertWithinBudget: вызов укладывается в бюджет из QUERY_BUDGETS"""
+
+    def assertWithinBudget(self, name, function, *args, **kwargs):
+        budget = QUERY_BUDGETS[name]
+
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            result = function(*args, **kwargs)
+            elapsed = time.perf_counter() - started
+
+        queries = '\n'.join(query['sql'] for query in captured.captured_queries)
+        self.assertLessEqual(
+            len(captured), budget['queries'],
+            f"{name}: {len(captured)} queries, budget {budget['queries']}:\n{queries}")
+        if CHECK_TIME_BUDGETS:
+            self.assertLessEqual(
+                elapsed, budget['seconds'],
+                f"{name}: {elapsed:.3f}s, budget {budget['seconds']}s")
+        return result
+
+
+def create_catalog(seed=1):
+    """Каталог рецептов с правдоподобными калориями и ингредиентами"""
+    bulk_insert(Recipe, make_recipes(CATALOG_SIZE, random.Random(seed)))
+
+
+def create_week_of_meal_plans(user, start):
+    """План на неделю вперед: по рецепту на каждый прием пищи, часть порций изменена"""
+    plans = []
+    for offset in range(7):
+        for meal_type, _ in Recipe.MEAL_TYPES:
+            plans.append(UserMealPlan(
+                user=user,
+                date=start + timedelta(days=offset),
+                meal_type=meal_type,
+                recipe=Recipe.objects.filter(meal_type=meal_type)[offset],
+                portion_multiplier=Decimal('1.5') if offset % 2 else Decimal('1.0'),
+            ))
+    UserMealPlan.objects.bulk_create(plans)
+
+
+# Отдельный кэш: тесты не трогают общий кэш меню; без профилей и лога медленных запросов
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SLOW_REQUEST_THRESHOLD=float('inf'),
+    PROFILING_SAMPLE_RATE=0,
+)
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Число запросов и время ответа страниц не растут незаметно (N+1, планировщик)"""
+
+    CALCULATOR_FORM = {
+        'gender': 'female', 'age': 32, 'weight': 64, 'height': 168,
+        'activity': 'moderate', 'goal': 'loss',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.user = CustomUser.objects.create_user(
+            'budget_user', password='budget-password', gender='male',
+            age=35, weight=82, height=181, activity_level='moderate', goal='maintenance')
+        UserProfile.objects.create(user=cls.user, daily_calories=2400)
+        create_week_of_meal_plans(cls.user, timezone.localdate())
+        cls.recipe = Recipe.objects.filter(meal_type='lunch').first()
+
+    def setUp(self):
+        # Планировщик выбирает рецепты случайно - фиксируем выбор
+        random.seed(0)
+
+    def test_anonymous_flow(self):
+        response = self.assertWithinBudget(
+            'calculate_calories', self.client.post,
+            reverse('calculate_calories'), self.CALCULATOR_FORM)
+        self.assertRedirects(response, reverse('week_plan'))
+
+        response = self.assertWithinBudget(
+            'week_plan_anonymous', self.client.get, reverse('week_plan'))
+        self.assertEqual(response.status_code, 200)
+
+        response = self.assertWithinBudget(
+            'day_plan_anonymous', self.client.get, reverse('day_plan', args=['wednesday']))
+        self.assertEqual(response.status_code, 200)
+
+    def test_recipe_detail(self):
+        response = self.assertWithinBudget(
+            'recipe_detail', self.client.get,
+            reverse('recipe_detail', args=[self.recipe.id]), {'portions': 3})
+        self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_flow(self):
+        self.client.force_login(self.user)
+
+        response = self.assertWithinBudget('week_plan', self.client.get, reverse('week_plan'))
+        self.assertEqual(response.status_code, 200)
+
+        response = self.assertWithinBudget(
+            'day_plan', self.client.get, reverse('day_plan', args=['friday']))
+        self.assertEqual(response.status_code, 200)
+
+        response = self.assertWithinBudget('dashboard', self.client.get, reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfileSetupTests(TestCase):
+    """Время напоминаний и часовой пояс пользователь меняет в настройках профиля"""
+
+    PROFILE_FORM = {
+        'first_name': 'Анна', 'last_name': 'Иванова', 'email': 'anna@example.com',
+        'age': 30, 'weight': 60, 'height': 165, 'gender': 'female',
+        'goal': 'maintenance', 'activity_level': 'light',
+    }
+
+    def test_schedule_change_reschedules_reminders(self):
+        user = CustomUser.objects.create_user('schedule_user', password='schedule-password')
+        UserNotificationSettings.objects.create(
+            user=user, next_morning_at=timezone.now(), next_evening_at=timezone.now())
+        self.client.force_login(user)
+
+        response = self.client.post(reverse('profile_setup'), {
+            **self.PROFILE_FORM,
+            'notifications-morning_reminder_time': '07:15',
+            'notifications-evening_reminder_time': '21:30',
+            'notifications-timezone': 'Europe/Moscow',
+        })
+        self.assertRedirects(response, reverse('dashboard'))
+
+        notification_settings = UserNotificationSettings.objects.get(user=user)
+        self.assertEqual(notification_settings.morning_reminder_time.strftime('%H:%M'), '07:15')
+        self.assertEqual(notification_settings.timezone, 'Europe/Moscow')
+        # Расписание пересчитает ближайший тик задачи напоминаний
+        self.assertIsNone(notification_settings.next_morning_at)
+        self.assertIsNone(notification_settings.next_evening_at)
+
+
+@override_settings(SLOW_REQUEST_THRESHOLD=float('inf'), PROFILING_SAMPLE_RATE=0)
+class RequestTimingTests(TestCase):
+    """Server-Timing считает SQL view и в синхронном, и в асинхронном стеке"""
+
+    QUERY_COUNT = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.recipe = Recipe.objects.first()
+
+    def assertCountsQueries(self, response):
+        self.assertEqual(response.status_code, 200)
+        queries = self.QUERY_COUNT.search(response['Server-Timing'])
+        self.assertIsNotNone(queries, response['Server-Timing'])
+        self.assertGreater(int(queries.group(1)), 0)
+
+    def test_sync_request_counts_queries(self):
+        self.assertCountsQueries(
+            self.client.get(reverse('recipe_detail', args=[self.recipe.id])))
+
+    async def test_async_request_counts_queries_of_sync_view(self):
+        # Под ASGI синхронная view выполняется в потоке sync_to_async
+        # со своими соединениями с БД
+        self.assertCountsQueries(
+            await self.async_client.get(reverse('recipe_detail', args=[self.recipe.id])))
+
+
+class ProfilingTests(TestCase):
+    """Профиль запроса содержит саму view и в синхронном, и в асинхронном стеке"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.recipe = Recipe.objects.first()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profiling_dir = directory.name
+
+    def assertProfiledView(self, view_name, function_name):
+        directory = os.path.join(self.profiling_dir, view_name)
+        dumps = os.listdir(directory)
+        self.assertEqual(len(dumps), 1)
+
+        stats = pstats.Stats(os.path.join(directory, dumps[0]))
+        functions = {function for _, _, function in stats.stats}
+        self.assertIn(function_name, functions)
+
+    def profiling(self):
+        # Middleware читает настройки при первом запросе клиента
+        return self.settings(
+            PROFILING_SAMPLE_RATE=1, PROFILING_DIR=self.profiling_dir,
+            SLOW_REQUEST_THRESHOLD=float('inf'))
+
+    def test_sync_request_profile_contains_view(self):
+        with self.profiling():
+            response = self.client.get(reverse('recipe_detail', args=[self.recipe.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertProfiledView('recipe_detail', 'recipe_detail')
+
+    async def test_async_request_profile_contains_sync_view(self):
+        # Под ASGI синхронная view выполняется не в потоке event loop
+        with self.profiling():
+            response = await self.async_client.get(
+                reverse('recipe_detail', args=[self.recipe.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertProfiledView('recipe_detail', 'recipe_detail')
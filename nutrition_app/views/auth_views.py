@@ -2,8 +2,9 @@ from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from ..models import UserProfile
-from ..forms import CustomUserCreationForm, CustomAuthenticationForm, UserProfileForm
+from ..models import UserNotificationSettings, UserProfile
+from ..forms import (
+    CustomUserCreationForm, CustomAuthenticationForm, NotificationScheduleForm, UserProfileForm)
 from .utils import get_motivational_message, calculate_user_calories
 
 
@@ -58,10 +59,16 @@ def user_logout(request):
 
 @login_required
 def profile_setup(request):
+    notification_settings, _ = UserNotificationSettings.objects.get_or_create(user=request.user)
+
     if request.method == 'POST':
         form = UserProfileForm(request.POST, instance=request.user)
-        if form.is_valid():
+        schedule_form = NotificationScheduleForm(
+            request.POST, instance=notification_settings, prefix='notifications')
+        if form.is_valid() and schedule_form.is_valid():
             user = form.save()
+            # Новое время или пояс - расписание напоминаний пересчитается само
+            schedule_form.save()
 
             # Рассчитываем калории на основе данных пользователя
             daily_calories = calculate_user_calories(user)
@@ -77,8 +84,13 @@ def profile_setup(request):
             return redirect('dashboard')
     else:
         form = UserProfileForm(instance=request.user)
+        schedule_form = NotificationScheduleForm(
+            instance=notification_settings, prefix='notifications')
 
-    return render(request, 'nutrition_app/profile_setup.html', {'form': form})
+    return render(request, 'nutrition_app/profile_setup.html', {
+        'form': form,
+        'schedule_form': schedule_form,
+    })
 
 
 @login_required
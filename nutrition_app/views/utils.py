@@ -2,6 +2,7 @@ import random
 import re
 from decimal import Decimal
 from ..models import Recipe
+from ..profiling import profiled
 
 
 def get_motivational_message(user):
@@ -86,8 +87,8 @@ def _adjust_ingredient_amount(ingredient_text, multiplier):
         else:
             new_amount = round(new_amount)
 
-        # Форматируем вывод
-        if new_amount.is_integer():
+        # Форматируем вывод (round без знаков уже вернул int)
+        if float(new_amount).is_integer():
             new_amount = int(new_amount)
 
         # Заменяем старое количество на новое
@@ -282,6 +283,7 @@ def _smart_portion_adjustment(breakfast, lunch, snack, dinner, total_target):
     return adjusted_meals[0], adjusted_meals[1], adjusted_meals[2], adjusted_meals[3], adjusted_calories
 
 
+@profiled
 def generate_optimized_weekly_meal_plan(daily_calories):
     """Генерирует оптимизированный рацион на неделю с корректировкой порций"""
     days_of_week = ['monday', 'tuesday', 'wednesday',
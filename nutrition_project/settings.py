@@ -37,6 +37,10 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'nutrition_app.CustomUser'
 
 MIDDLEWARE = [
+    # Выборочное профилирование (PROFILING_SAMPLE_RATE, PROFILING_TOKEN); без них не подключается
+    'nutrition_app.profiling.ProfilingMiddleware',
+    # Первым, чтобы в замер попали запросы к базе всех остальных middleware
+    'nutrition_app.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,7 +54,9 @@ ROOT_URLCONF = 'nutrition_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'nutrition_app.middleware.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,9 +77,32 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Держим соединения открытыми между запросами (бот, демон отправки)
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Cache
+# Кэш меню бота общий для сайта, бота и Celery: сброс в одном процессе
+# должен быть виден остальным, поэтому он работает только с Redis.
+# Без Redis - кэш в памяти процесса, а кэш меню выключен
+# (файловый кэш не годится: каждая запись обходит весь каталог)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,6 +139,41 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Замер запросов (nutrition_app.middleware): Server-Timing и лог медленных запросов
+SLOW_REQUEST_THRESHOLD = float(os.getenv('SLOW_REQUEST_THRESHOLD', 1.0))  # Секунд
+SLOW_REQUEST_TOP_QUERIES = 5  # Сколько самых частых SQL писать в лог
+SLOW_REQUEST_LOG = os.getenv('SLOW_REQUEST_LOG', str(BASE_DIR / 'slow_requests.log'))
+
+# Выборочное профилирование (nutrition_app.profiling): каждый N-й запрос к сайту
+# и запуск задачи Celery; 0 - выключено. Запрос с заголовком X-Profile: <PROFILING_TOKEN>
+# профилируется всегда. Сводка по профилям - manage.py profile_report
+PROFILING_SAMPLE_RATE = int(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_REQUEST_LOG,
+            'formatter': 'timestamped',
+            'delay': True,  # Файл появится только с первым медленным запросом
+        },
+    },
+    'loggers': {
+        'nutrition_app.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Authentication settings
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'index'
@@ -118,9 +182,13 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 SITE_URL = os.getenv('SITE_URL')
 
 # Celery Configuration
-CELERY_BROKER_URL = 'memory://'
-CELERY_RESULT_BACKEND = 'cache+memory://'
-CELERY_TASK_ALWAYS_EAGER = True  # Задачи выполняются синхронно
+# По умолчанию задачи выполняются синхронно в вызывающем процессе.
+# Для настоящих воркеров: CELERY_TASK_ALWAYS_EAGER=False и брокер, например
+# filesystem:// (папка на этой машине), sqla+sqlite:///celery.sqlite3 (нужен
+# SQLAlchemy) или redis://
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'memory://')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'cache+memory://')
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'True') == 'True'
 CELERY_TASK_EAGER_PROPAGATES = True
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
@@ -128,10 +196,79 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Krasnoyarsk'
 CELERY_ENABLE_UTC = False
 
+if CELERY_BROKER_URL == 'filesystem://':
+    CELERY_BROKER_FOLDER = BASE_DIR / 'celery_broker'
+    CELERY_BROKER_FOLDER.mkdir(exist_ok=True)
+    CELERY_BROKER_TRANSPORT_OPTIONS = {
+        'data_folder_in': str(CELERY_BROKER_FOLDER),
+        'data_folder_out': str(CELERY_BROKER_FOLDER),
+        'control_folder': str(CELERY_BROKER_FOLDER / 'control'),
+    }
+
 # Celery Beat Schedule
 CELERY_BEAT_SCHEDULE = {
     'check-all-reminders': {
         'task': 'telegram_bot.tasks.check_all_reminders',
         'schedule': 30.0,  # Каждые 30 секунд
     },
+    'purge-reminder-deliveries': {
+        'task': 'telegram_bot.tasks.purge_reminder_deliveries',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'send-weekly-reports': {
+        'task': 'telegram_bot.tasks.send_weekly_reports',
+        'schedule': crontab(day_of_week='sun', hour=19, minute=0),
+    },
 }
+
+# Telegram Bot API (можно указать локальную заглушку, см. telegram_bot/fake_telegram.py)
+TELEGRAM_API_BASE_URL = os.getenv(
+    'TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+# Webhook: секрет из заголовка X-Telegram-Bot-Api-Secret-Token
+TELEGRAM_WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+TELEGRAM_CONCURRENT_UPDATES = 32  # Сколько обновлений обрабатывать одновременно
+TELEGRAM_DB_POOL_SIZE = 8  # Потоков для запросов бота к базе данных
+# Кэш привязки Telegram-аккаунтов и настроек уведомлений в памяти процесса бота.
+# В своем процессе сбрасывается сигналами моделей, изменения из других
+# процессов (сайт, Celery) видны не позже чем через TTL
+TELEGRAM_IDENTITY_CACHE_SIZE = 10000  # Записей
+TELEGRAM_IDENTITY_CACHE_TTL = 300  # Секунд
+# Готовые тексты меню по (пользователь, дата); сбрасываются при изменении планов и рецептов.
+# 0 - не кэшировать (без Redis процессы не видят сбросов друг друга)
+TELEGRAM_MENU_CACHE_TTL = 6 * 60 * 60 if REDIS_URL else 0  # Секунд
+# Не редактируем сообщение, если текст и кнопки не изменились
+TELEGRAM_RENDERED_MESSAGES_CACHE_SIZE = 10000  # Сообщений
+TELEGRAM_RENDERED_MESSAGES_TTL = 24 * 60 * 60  # Секунд
+TELEGRAM_BUTTON_DEBOUNCE = 1.0  # Секунд, в течение которых повторное нажатие кнопки игнорируется
+TELEGRAM_BUTTON_DEBOUNCE_CACHE_SIZE = 10000  # Последних нажатий (пользователь, кнопка) в памяти
+
+# Отправка уведомлений в Telegram
+TELEGRAM_SEND_CONCURRENCY = 20  # Одновременных запросов к Bot API
+TELEGRAM_GLOBAL_RATE_LIMIT = 30  # Сообщений в секунду на бота (лимит Telegram)
+TELEGRAM_PER_CHAT_RATE_LIMIT = 1  # Сообщений в секунду в один чат
+# direct - отправка прямо из Celery-задачи, queue - через очередь демона run_sender
+TELEGRAM_REMINDER_DELIVERY = os.getenv('TELEGRAM_REMINDER_DELIVERY', 'direct')
+TELEGRAM_SENDER_LEASE = 60  # Секунд аренды взятого демоном сообщения
+# Из аренды столько секунд оставляем на повторы и паузы флуд-контроля; остальное
+# делится на текущую скорость отправки - так получается размер пачки
+TELEGRAM_SENDER_LEASE_MARGIN = 20
+# Повторы при сетевых ошибках: экспоненциальная задержка с потолком
+TELEGRAM_SEND_MAX_ATTEMPTS = 5
+TELEGRAM_SEND_BACKOFF_BASE = 1  # Секунд перед первым повтором
+TELEGRAM_SEND_BACKOFF_CAP = 60  # Максимальная задержка, секунд
+TELEGRAM_SEND_MAX_INLINE_DELAY = 5  # Более долгие паузы пережидаем в очереди
+
+# Насколько может опоздать напоминание (время и пояс задаются в UserNotificationSettings)
+TELEGRAM_REMINDER_GRACE_PERIOD = 15 * 60  # Секунд; более старые напоминания пропускаем
+TELEGRAM_REMINDER_LEDGER_RETENTION_DAYS = 7  # Сколько дней хранить журнал отправок
+# Секунд от слота до ответа Telegram; дольше - счетчик telegram_reminder_delay_alerts_total
+# и предупреждение в лог: пора добавлять мощности для рассылки
+TELEGRAM_REMINDER_DELAY_ALERT = 60
+# Метрики конвейера напоминаний: каждый процесс пишет сюда свой файл,
+# /telegram/metrics/ отдает их сумму в формате Prometheus
+TELEGRAM_METRICS_DIR = os.getenv('TELEGRAM_METRICS_DIR', str(BASE_DIR / 'metrics'))
+# Токен для /telegram/metrics/ (Authorization: Bearer <токен>). Без него эндпоинт
+# отвечает только на запросы с localhost - за обратным прокси его не публиковать
+TELEGRAM_METRICS_TOKEN = os.getenv('TELEGRAM_METRICS_TOKEN')
+# Размер шарда рассылки: диапазон id пользователей на одну задачу process_reminder_shard
+TELEGRAM_REMINDER_SHARD_SIZE = 1000
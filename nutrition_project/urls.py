@@ -22,6 +22,7 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('telegram/', include('telegram_bot.urls')),
     path('', include('nutrition_app.urls')),
 ]
 if settings.DEBUG:
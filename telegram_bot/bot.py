@@ -1,20 +1,41 @@
-import os
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+import threading
 from django.conf import settings
 
 
-TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+# Application создается при первом обращении: сайту и Celery не нужно
+# импортировать python-telegram-bot и иметь токен бота
+_application = None
+_lock = threading.Lock()
 
-if not TELEGRAM_BOT_TOKEN:
-    raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
 
+def get_application():
+    """Application бота с зарегистрированными обработчиками"""
+    global _application
 
-application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    with _lock:
+        if _application is None:
+            from telegram.ext import Application
+
+            if not settings.TELEGRAM_BOT_TOKEN:
+                raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
+
+            application = (
+                Application.builder()
+                .token(settings.TELEGRAM_BOT_TOKEN)
+                .base_url(settings.TELEGRAM_API_BASE_URL)
+                .concurrent_updates(settings.TELEGRAM_CONCURRENT_UPDATES)
+                .build()
+            )
+            setup_handlers(application)
+            _application = application
+
+    return _application
 
 # Функция для регистрации обработчиков
 
 
-def setup_handlers():
+def setup_handlers(application):
+    from telegram.ext import CommandHandler, CallbackQueryHandler
     from . import handlers
 
     # Основные команды
@@ -29,8 +50,8 @@ def setup_handlers():
     application.add_handler(CallbackQueryHandler(handlers.handle_all_buttons))
 
 
-# Сразу настраиваем обработчики при импорте
-setup_handlers()
-
-# Алиас для обратной совместимости
-bot = application
+def __getattr__(name):
+    # Обратная совместимость: from telegram_bot.bot import application (или bot)
+    if name in ('application', 'bot'):
+        return get_application()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,226 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from telegram_bot.db import db_sync_to_async
+
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU-кэш в памяти процесса с ограниченным временем жизни записей"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # Сигналы моделей приходят из потоков пула БД
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, MISSING)
+            if item is MISSING:
+                return default
+
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ===== КЭШ TELEGRAM-ПОЛЬЗОВАТЕЛЕЙ =====
+
+# telegram_id -> {'user_id', 'chat_id', 'settings'} или None, если аккаунт не привязан
+identity_cache = TTLCache(
+    settings.TELEGRAM_IDENTITY_CACHE_SIZE, settings.TELEGRAM_IDENTITY_CACHE_TTL)
+
+# user_id -> telegram_id, чтобы сбрасывать кэш по изменению настроек пользователя.
+# Тех же размера и TTL: если запись вытеснится раньше, устаревшие настройки
+# проживут не дольше TTL - как и изменения из других процессов
+_telegram_ids = TTLCache(
+    settings.TELEGRAM_IDENTITY_CACHE_SIZE, settings.TELEGRAM_IDENTITY_CACHE_TTL)
+
+FIRST_USER_KEY = 'first_user'
+
+
+@db_sync_to_async
+def _load_identity(telegram_id):
+    from nutrition_app.models import TelegramUser, UserNotificationSettings
+    try:
+        telegram_user = TelegramUser.objects.get(telegram_id=telegram_id)
+    except TelegramUser.DoesNotExist:
+        return None
+
+    notification_settings = UserNotificationSettings.objects.get_or_create(
+        user_id=telegram_user.user_id)[0]
+
+    return {
+        'user_id': telegram_user.user_id,
+        'chat_id': telegram_user.chat_id,
+        'settings': notification_settings,
+    }
+
+
+async def get_identity(telegram_id):
+    """Пользователь сайта, чат и настройки уведомлений по telegram_id (из кэша)"""
+    identity = identity_cache.get(telegram_id, MISSING)
+
+    if identity is MISSING:
+        identity = await _load_identity(telegram_id)
+        identity_cache.set(telegram_id, identity)
+        if identity:
+            _telegram_ids.set(identity['user_id'], telegram_id)
+
+    return identity
+
+
+def cache_identity_settings(telegram_id, notification_settings):
+    """Обновляет настройки в кэше после записи, которая не вызывает post_save"""
+    identity = identity_cache.get(telegram_id)
+    if identity:
+        identity_cache.set(telegram_id, {**identity, 'settings': notification_settings})
+
+
+@db_sync_to_async
+def _load_first_user_id():
+    from nutrition_app.models import CustomUser
+    return CustomUser.objects.values_list('id', flat=True).first()
+
+
+async def get_first_user_id():
+    """id первого пользователя сайта - для тех, кто еще не привязал аккаунт"""
+    user_id = identity_cache.get(FIRST_USER_KEY, MISSING)
+    if user_id is MISSING:
+        user_id = await _load_first_user_id()
+        identity_cache.set(FIRST_USER_KEY, user_id)
+    return user_id
+
+
+def invalidate_telegram_id(telegram_id):
+    identity_cache.delete(telegram_id)
+
+
+def invalidate_user(user_id):
+    telegram_id = _telegram_ids.get(user_id)
+    if telegram_id is not None:
+        _telegram_ids.delete(user_id)
+        identity_cache.delete(telegram_id)
+
+
+# ===== КЭШ ГОТОВЫХ МЕНЮ =====
+
+# Версия всех меню: при изменении рецепта проще сменить версию,
+# чем искать все планы, где он встречается
+MENU_VERSION_KEY = 'telegram_menu:version'
+
+# personal - ответ на /menu и "🔄 Обновить", daily - утреннее напоминание
+MENU_KINDS = ('personal', 'daily')
+
+
+def _menu_cache_enabled():
+    return settings.TELEGRAM_MENU_CACHE_TTL > 0
+
+
+def _menu_version():
+    return cache.get_or_set(MENU_VERSION_KEY, 1, timeout=None)
+
+
+def _menu_key(version, kind, user_id, target_date):
+    return f'telegram_menu:{version}:{kind}:{user_id}:{target_date}'
+
+
+def get_cached_menus(kind, keys):
+    """Готовые меню из кэша для пар (user_id, дата); промахи в ответ не попадают"""
+    if not keys or not _menu_cache_enabled():
+        return {}
+
+    version = _menu_version()
+    cache_keys = {
+        _menu_key(version, kind, user_id, target_date): (user_id, target_date)
+        for user_id, target_date in keys
+    }
+    found = cache.get_many(list(cache_keys))
+    return {cache_keys[cache_key]: text for cache_key, text in found.items()}
+
+
+def cache_menus(kind, messages):
+    """Сохраняет меню вида {(user_id, дата): текст}"""
+    if not messages or not _menu_cache_enabled():
+        return
+
+    version = _menu_version()
+    cache.set_many(
+        {
+            _menu_key(version, kind, user_id, target_date): text
+            for (user_id, target_date), text in messages.items()
+        },
+        timeout=settings.TELEGRAM_MENU_CACHE_TTL
+    )
+
+
+def get_or_render_menu(kind, user_id, target_date, render):
+    """Меню из кэша, а при промахе - render() с сохранением результата"""
+    if not _menu_cache_enabled():
+        return render()
+
+    key = _menu_key(_menu_version(), kind, user_id, target_date)
+    text = cache.get(key)
+
+    if text is None:
+        text = render()
+        cache.set(key, text, timeout=settings.TELEGRAM_MENU_CACHE_TTL)
+
+    return text
+
+
+def invalidate_menu(user_id, target_date):
+    if not _menu_cache_enabled():
+        return
+    version = _menu_version()
+    cache.delete_many([
+        _menu_key(version, kind, user_id, target_date) for kind in MENU_KINDS
+    ])
+
+
+def invalidate_all_menus():
+    if not _menu_cache_enabled():
+        return
+    try:
+        cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        cache.set(MENU_VERSION_KEY, 2, timeout=None)
+
+
+# ===== ОТРИСОВАННЫЕ СООБЩЕНИЯ И НАЖАТИЯ КНОПОК =====
+
+# (chat_id, message_id) -> хэш текста и клавиатуры, показанных в сообщении
+rendered_messages = TTLCache(
+    settings.TELEGRAM_RENDERED_MESSAGES_CACHE_SIZE, settings.TELEGRAM_RENDERED_MESSAGES_TTL)
+
+# (telegram_id, callback_data) -> запись живет, пока повторное нажатие игнорируется
+recent_taps = TTLCache(
+    settings.TELEGRAM_BUTTON_DEBOUNCE_CACHE_SIZE, settings.TELEGRAM_BUTTON_DEBOUNCE)
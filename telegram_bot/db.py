@@ -0,0 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+# Отдельный пул потоков для запросов бота к базе. Стандартный sync_to_async
+# (thread_sensitive=True) выполняет все запросы по очереди в одном потоке
+_executor = ThreadPoolExecutor(
+    max_workers=settings.TELEGRAM_DB_POOL_SIZE,
+    thread_name_prefix='telegram-db'
+)
+
+
+def db_sync_to_async(func):
+    """Замена @sync_to_async для работы бота с ORM.
+
+    Функция выполняется в пуле из TELEGRAM_DB_POOL_SIZE потоков, поэтому
+    медленный запрос одного пользователя не блокирует остальных. Соединение
+    с базой у каждого потока свое и живет CONN_MAX_AGE секунд; протухшие и
+    сломанные соединения закрываются перед каждым вызовом, как в начале
+    HTTP-запроса в Django.
+    """
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        return func(*args, **kwargs)
+
+    return sync_to_async(run, thread_sensitive=False, executor=_executor)
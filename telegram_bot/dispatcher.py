@@ -0,0 +1,305 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from telegram import Bot
+from telegram.error import BadRequest, ChatMigrated, Forbidden, InvalidToken, NetworkError, RetryAfter
+from telegram.request import HTTPXRequest
+from telegram_bot import metrics
+
+logger = logging.getLogger(__name__)
+
+
+MAX_CHAT_BUCKETS = 10000
+
+# Результаты отправки одного сообщения
+SENT = 'sent'
+DEFERRED = 'deferred'  # Отложено: повторим позже через очередь
+FAILED = 'failed'  # Постоянная ошибка: в таблицу неотправленных
+
+# Ошибки, которые не исправятся повтором
+PERMANENT_ERRORS = (BadRequest, Forbidden, InvalidToken, ChatMigrated)
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0
+        self._lock = asyncio.Lock()
+
+    def block(self, seconds):
+        """Не выдавать токены ближайшие seconds секунд (ответ Telegram 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    async def acquire(self, max_block=None):
+        """Ждем, пока в ведре появится токен, и забираем его.
+
+        Если ведро заблокировано дольше max_block секунд, возвращаем False.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+
+                if now < self.blocked_until:
+                    if max_block is not None and self.blocked_until - now > max_block:
+                        return False
+                    await asyncio.sleep(self.blocked_until - now)
+                    self.updated_at = time.monotonic()
+                    continue
+
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Глобальный лимит Telegram + отдельный лимит на каждый чат.
+
+    Глобальная скорость подстраивается: после 429 она падает вдвое,
+    а с каждой успешной отправкой понемногу возвращается к настроенной.
+    """
+
+    def __init__(self, global_rate, per_chat_rate):
+        self.max_global_rate = global_rate
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets = {}
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(
+                self.per_chat_rate, capacity=1)
+        return bucket
+
+    async def acquire(self, chat_id, max_block=None):
+        """Ждем разрешения на отправку в чат. False - бот или чат
+        на паузе флуд-контроля дольше max_block секунд"""
+        # В долгоживущем процессе не копим ведра давно молчащих чатов
+        if len(self.chat_buckets) > MAX_CHAT_BUCKETS:
+            self._prune()
+
+        if not await self._chat_bucket(chat_id).acquire(max_block):
+            return False
+        return await self.global_bucket.acquire(max_block)
+
+    def on_flood(self, chat_id, retry_after):
+        """Telegram попросил подождать: тормозим и чат, и бота целиком"""
+        self._chat_bucket(chat_id).block(retry_after)
+        self.global_bucket.block(retry_after)
+        self.global_bucket.rate = max(1, self.global_bucket.rate / 2)
+
+    def blocked_for(self, chat_id):
+        """Сколько секунд еще действует пауза от флуд-контроля для чата"""
+        bucket = self.chat_buckets.get(chat_id)
+        blocked_until = max(
+            self.global_bucket.blocked_until, bucket.blocked_until if bucket else 0)
+        return max(0, blocked_until - time.monotonic())
+
+    def on_success(self):
+        if self.global_bucket.rate < self.max_global_rate:
+            self.global_bucket.rate = min(
+                self.max_global_rate, self.global_bucket.rate + 0.1)
+
+    def _prune(self):
+        border = time.monotonic() - 60
+        self.chat_buckets = {
+            chat_id: bucket
+            for chat_id, bucket in self.chat_buckets.items()
+            if bucket.updated_at > border
+        }
+
+
+def _backoff(attempt):
+    """Экспоненциальная задержка перед повтором после сетевой ошибки"""
+    return min(
+        settings.TELEGRAM_SEND_BACKOFF_CAP,
+        settings.TELEGRAM_SEND_BACKOFF_BASE * 2 ** (attempt - 1)
+    )
+
+
+def _record_reminder_delay(message):
+    """Задержка напоминания от его слота до ответа Telegram, секунд.
+
+    Для обычных сообщений (без слота) возвращает None.
+    """
+    slot = message.get('slot')
+    if slot is None:
+        return None
+
+    delay = (timezone.now() - slot).total_seconds()
+    reminder_type = message.get('reminder_type', '')
+    metrics.REMINDER_DELAY_SECONDS.observe(
+        delay, type=reminder_type, shard=message.get('shard', ''))
+    if delay > settings.TELEGRAM_REMINDER_DELAY_ALERT:
+        metrics.REMINDER_DELAY_ALERTS.inc(type=reminder_type)
+    return delay
+
+
+def _retry_after_seconds(error):
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+async def _send_one(bot, semaphore, limiter, message):
+    """Отправка одного сообщения с учетом лимитов и повторов.
+
+    Возвращает словарь: status (SENT, DEFERRED или FAILED), attempts,
+    а также delay для отложенных, error для неудачных и reminder_delay
+    (задержку от слота) для отправленных напоминаний.
+    """
+    attempts = message.get('attempts', 0)
+
+    while True:
+        async with semaphore:
+            allowed = await limiter.acquire(
+                message['chat_id'], max_block=settings.TELEGRAM_SEND_MAX_INLINE_DELAY)
+            if not allowed:
+                # Бот или чат на долгой паузе - откладываем сообщение
+                return {'status': DEFERRED, 'attempts': attempts,
+                        'delay': limiter.blocked_for(message['chat_id']),
+                        'error': 'Flood control'}
+
+            started = time.monotonic()
+            try:
+                await bot.send_message(
+                    chat_id=message['chat_id'],
+                    text=message['text'],
+                    parse_mode=message.get('parse_mode', 'Markdown') or None
+                )
+                limiter.on_success()
+                return {'status': SENT, 'attempts': attempts + 1,
+                        'reminder_delay': _record_reminder_delay(message)}
+
+            except RetryAfter as e:
+                # Флуд-контроль - не вина сообщения, попытку не считаем
+                metrics.FLOOD_WAITS.inc()
+                delay = _retry_after_seconds(e)
+                limiter.on_flood(message['chat_id'], delay)
+                error = str(e)
+
+            except PERMANENT_ERRORS as e:
+                return {'status': FAILED, 'attempts': attempts + 1, 'error': str(e)}
+
+            except NetworkError as e:
+                attempts += 1
+                if attempts >= settings.TELEGRAM_SEND_MAX_ATTEMPTS:
+                    return {'status': FAILED, 'attempts': attempts, 'error': str(e)}
+                delay = _backoff(attempts)
+                error = str(e)
+
+            except Exception as e:
+                return {'status': FAILED, 'attempts': attempts + 1, 'error': str(e)}
+
+            finally:
+                metrics.SEND_SECONDS.observe(time.monotonic() - started)
+
+        # Долгие паузы не ждем на месте, а возвращаем сообщение в очередь
+        if delay > settings.TELEGRAM_SEND_MAX_INLINE_DELAY:
+            return {'status': DEFERRED, 'attempts': attempts, 'delay': delay, 'error': error}
+
+        await asyncio.sleep(delay)
+
+
+@asynccontextmanager
+async def pooled_bot():
+    """Bot с собственным пулом HTTP-соединений, живущим внутри текущего event loop"""
+    request = HTTPXRequest(
+        connection_pool_size=settings.TELEGRAM_SEND_CONCURRENCY)
+    await request.initialize()
+    try:
+        yield Bot(
+            settings.TELEGRAM_BOT_TOKEN,
+            base_url=settings.TELEGRAM_API_BASE_URL,
+            request=request
+        )
+    finally:
+        await request.shutdown()
+
+
+def create_limits():
+    """Семафор и ограничитель частоты для отправки"""
+    semaphore = asyncio.Semaphore(settings.TELEGRAM_SEND_CONCURRENCY)
+    limiter = RateLimiter(
+        settings.TELEGRAM_GLOBAL_RATE_LIMIT,
+        settings.TELEGRAM_PER_CHAT_RATE_LIMIT
+    )
+    return semaphore, limiter
+
+
+async def send_batch(bot, semaphore, limiter, messages):
+    """Отправляет сообщения через готовый bot; возвращает результаты по порядку"""
+    results = await asyncio.gather(
+        *(_send_one(bot, semaphore, limiter, message) for message in messages)
+    )
+
+    for result in results:
+        metrics.MESSAGES.inc(status=result['status'])
+
+    # Одна строка в лог на пачку: при нехватке мощности опаздывают тысячи напоминаний
+    late = [
+        result['reminder_delay'] for result in results
+        if (result.get('reminder_delay') or 0) > settings.TELEGRAM_REMINDER_DELAY_ALERT
+    ]
+    if late:
+        logger.warning(
+            "%d of %d reminders acknowledged more than %ss after their slot (max %.0fs)",
+            len(late), len(results), settings.TELEGRAM_REMINDER_DELAY_ALERT, max(late))
+
+    return results
+
+
+async def dispatch_messages(messages):
+    """Отправляет пачку сообщений из одного event loop.
+
+    Каждое сообщение - словарь с ключами chat_id, text и (необязательно) parse_mode.
+    Возвращает результаты отправки в том же порядке.
+    """
+    semaphore, limiter = create_limits()
+
+    # Один HTTP-клиент с пулом соединений на всю пачку
+    async with pooled_bot() as bot:
+        return await send_batch(bot, semaphore, limiter, messages)
+
+
+def send_messages(messages):
+    """Синхронная обертка для Celery-задач.
+
+    Отложенные сообщения уходят в очередь демона, неудачные - в таблицу
+    неотправленных. Возвращает количество успешно отправленных.
+    """
+    if not messages:
+        return 0
+
+    from telegram_bot.sender import record_failures, requeue_messages
+
+    results = asyncio.run(dispatch_messages(messages))
+
+    requeue_messages([
+        (message, result) for message, result in zip(messages, results)
+        if result['status'] == DEFERRED
+    ])
+    record_failures([
+        (message, result) for message, result in zip(messages, results)
+        if result['status'] == FAILED
+    ])
+
+    return sum(1 for result in results if result['status'] == SENT)
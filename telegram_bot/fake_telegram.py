@@ -0,0 +1,235 @@
+"""Локальная заглушка Telegram Bot API для офлайн-проверки бота.
+
+Сервер отвечает на методы, которыми пользуется бот, и запоминает все вызовы.
+Бот направляется на заглушку настройкой TELEGRAM_API_BASE_URL.
+
+Для нагрузочных прогонов можно задать задержку ответа (latency) и отвечать
+429 на каждую flood_every-ю отправку. Обновления для getUpdates кладутся
+в очередь через push_update.
+"""
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+FAKE_BOT_USER = {
+    'id': 1,
+    'is_bot': True,
+    'first_name': 'Fake Nutrition Bot',
+    'username': 'fake_nutrition_bot',
+}
+
+
+# Методы, на которые действует flood_every
+FLOOD_METHODS = ('sendMessage', 'editMessageText')
+
+# Дольше не держим long polling, чтобы бот быстро останавливался
+MAX_POLL_TIMEOUT = 1
+
+
+class FakeTelegramServer:
+    """Заглушка Bot API в отдельном потоке"""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0, flood_every=0, retry_after=1):
+        self.calls = []
+        self.latency = latency
+        self.flood_every = flood_every
+        self.retry_after = retry_after
+        self.flood_count = 0
+        self._lock = threading.Lock()
+        self._message_ids = itertools.count(1)
+        self._sends = itertools.count(1)
+        self._updates = []
+        self._updates_ready = threading.Condition(self._lock)
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Значение для TELEGRAM_API_BASE_URL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def calls_to(self, method):
+        with self._lock:
+            return [params for name, params, _ in self.calls if name == method]
+
+    def wait_for_calls(self, count, timeout=5):
+        """Ждем, пока бот сделает не меньше count вызовов"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self.calls) >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def push_update(self, update):
+        """Кладет обновление в очередь, которую бот заберет через getUpdates"""
+        with self._updates_ready:
+            self._updates.append(update)
+            self._updates_ready.notify_all()
+
+    # ===== ОТВЕТЫ НА МЕТОДЫ =====
+
+    def handle_method(self, method, params):
+        """Возвращает (HTTP-статус, тело ответа) для вызова метода"""
+        with self._lock:
+            self.calls.append((method, params, time.monotonic()))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if method in FLOOD_METHODS and self._flood():
+            return 429, {
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }
+
+        handler = getattr(self, f'_method_{method}', None)
+        if handler is None:
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+        return 200, {'ok': True, 'result': handler(params)}
+
+    def _flood(self):
+        if not self.flood_every or next(self._sends) % self.flood_every:
+            return False
+        with self._lock:
+            self.flood_count += 1
+        return True
+
+    def _message(self, params):
+        return {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'from': FAKE_BOT_USER,
+            'text': params.get('text', ''),
+        }
+
+    def _method_getMe(self, params):
+        return FAKE_BOT_USER
+
+    def _method_sendMessage(self, params):
+        return self._message(params)
+
+    def _method_editMessageText(self, params):
+        return self._message(params)
+
+    def _method_answerCallbackQuery(self, params):
+        return True
+
+    def _method_setWebhook(self, params):
+        return True
+
+    def _method_deleteWebhook(self, params):
+        return True
+
+    def _method_getUpdates(self, params):
+        offset = int(params.get('offset') or 0)
+        timeout = min(float(params.get('timeout') or 0), MAX_POLL_TIMEOUT)
+
+        with self._updates_ready:
+            # Подтвержденные через offset обновления больше не отдаем
+            self._updates = [
+                update for update in self._updates if update['update_id'] >= offset]
+            if not self._updates:
+                self._updates_ready.wait(timeout)
+            return list(self._updates)
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    params = json.loads(body or '{}')
+                else:
+                    params = dict(parse_qsl(body))
+
+                method = urlparse(self.path).path.rsplit('/', 1)[-1]
+                status, payload = fake.handle_method(method, params)
+
+                response = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            do_GET = do_POST
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ===== СИНТЕТИЧЕСКИЕ ОБНОВЛЕНИЯ =====
+
+
+def _user(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'}
+
+
+def make_command_update(update_id, user_id, text):
+    """Обновление с сообщением (например, командой /start)"""
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': _user(user_id),
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{
+            'type': 'bot_command',
+            'offset': 0,
+            'length': len(text.split()[0]),
+        }]
+    return {'update_id': update_id, 'message': message}
+
+
+def make_callback_update(update_id, user_id, data, message_id=1):
+    """Обновление с нажатием inline-кнопки"""
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': _user(user_id),
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': FAKE_BOT_USER,
+                'text': '🍏 Главное меню:',
+            },
+        },
+    }
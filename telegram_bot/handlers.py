@@ -1,9 +1,11 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler
 from django.utils import timezone
 import datetime
-from asgiref.sync import sync_to_async
-import asyncio
+import hashlib
+from .db import db_sync_to_async
+from .cache import cache_identity_settings, get_first_user_id, get_identity, recent_taps, rendered_messages
 
 # ===== ОСНОВНЫЕ КОМАНДЫ =====
 
@@ -69,9 +71,11 @@ async def show_tomorrow_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def _show_menu_for_date(update: Update, date, callback_data):
     """Общая функция показа меню на дату"""
     try:
-        from .utils import generate_personal_menu_message_async, get_first_user_async
-        user = await get_first_user_async()
-        menu_message = await generate_personal_menu_message_async(user, date) if user else "❌ Нет пользователей"
+        from .utils import generate_personal_menu_message_async
+        # Привязанный аккаунт, иначе - первый пользователь сайта
+        identity = await get_identity(update.effective_user.id)
+        user_id = identity['user_id'] if identity else await get_first_user_id()
+        menu_message = await generate_personal_menu_message_async(user_id, date) if user_id else "❌ Нет пользователей"
     except Exception as e:
         menu_message = f"🍽️ Ошибка загрузки меню: {e}"
 
@@ -105,16 +109,25 @@ async def show_updated_status(update: Update, context: ContextTypes.DEFAULT_TYPE
     settings = await _get_user_settings(update.effective_user.id)
 
     if not settings:
-        await update.callback_query.edit_message_text("❌ Аккаунт не привязан")
+        await _send_or_edit_message(update, "❌ Аккаунт не привязан")
         return
 
-    current_time = timezone.now().strftime('%H:%M:%S')
-    message = await _build_status_message(settings, current_time)
+    # Без метки времени: при неизменных настройках повторное нажатие
+    # не редактирует сообщение (см. _send_or_edit_message)
+    message = await _build_status_message(settings)
     keyboard = _build_settings_keyboard()
 
     await _send_or_edit_message(update, message, keyboard, parse_mode='Markdown')
 
 
+# Какой флаг настроек переключает каждая кнопка
+TOGGLE_FIELDS = {
+    'all': 'is_subscribed',
+    'morning': 'send_morning_reminder',
+    'evening': 'send_evening_reminder',
+}
+
+
 async def toggle_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Переключение всех уведомлений"""
     await _toggle_setting(update, 'all', "Уведомления")
@@ -132,42 +145,59 @@ async def toggle_evening_reminders(update: Update, context: ContextTypes.DEFAULT
 
 async def _toggle_setting(update: Update, setting_type, setting_name):
     """Общая функция переключения настроек"""
-    @sync_to_async
-    def toggle_and_save(telegram_id, s_type):
-        from nutrition_app.models import TelegramUser, UserNotificationSettings
-        try:
-            telegram_user = TelegramUser.objects.get(telegram_id=telegram_id)
-            settings = UserNotificationSettings.objects.get_or_create(
-                user=telegram_user.user)[0]
+    identity = await get_identity(update.effective_user.id)
 
-            if s_type == 'all':
-                settings.is_subscribed = not settings.is_subscribed
-            elif s_type == 'morning':
-                settings.send_morning_reminder = not settings.send_morning_reminder
-            elif s_type == 'evening':
-                settings.send_evening_reminder = not settings.send_evening_reminder
-
-            settings.save()
-            return settings
-        except:
-            return None
-
-    settings = await toggle_and_save(update.effective_user.id, setting_type)
+    try:
+        settings = await _toggle_in_db(identity['user_id'], setting_type) if identity else None
+    except Exception:
+        settings = None
 
     if not settings:
-        await update.callback_query.edit_message_text("❌ Ошибка")
+        await _send_or_edit_message(update, "❌ Ошибка")
         return
 
-    if setting_type == 'all':
-        is_enabled = settings.is_subscribed
-    else:
-        is_enabled = getattr(settings, f'send_{setting_type}_reminder')
+    # UPDATE не вызывает post_save - обновляем кэш сами
+    cache_identity_settings(update.effective_user.id, settings)
 
+    is_enabled = getattr(settings, TOGGLE_FIELDS[setting_type])
     status = "ВКЛЮЧЕНЫ" if is_enabled else "ВЫКЛЮЧЕНЫ"
 
-    await update.callback_query.edit_message_text(f"✅ {setting_name} {status}")
-    await asyncio.sleep(1)
-    await notifications_settings(update, context)
+    # Итог и меню настроек - одним редактированием по возвращенной строке
+    message = f"✅ {setting_name} {status}\n\n" + await _build_settings_message(settings)
+    await _send_or_edit_message(update, message, _build_settings_keyboard(), parse_mode='Markdown')
+
+
+@db_sync_to_async
+def _toggle_in_db(user_id, setting_type):
+    """Переключает флаг одним UPDATE ... SET col = NOT col RETURNING.
+
+    Два быстрых нажатия не теряют друг друга: каждое инвертирует
+    текущее значение в базе. Возвращает обновленные настройки.
+    """
+    from django.db import connection
+    from nutrition_app.models import UserNotificationSettings
+
+    meta = UserNotificationSettings._meta
+    quote = connection.ops.quote_name
+    # Имя колонки берем только из TOGGLE_FIELDS, не из данных кнопки
+    column = quote(meta.get_field(TOGGLE_FIELDS[setting_type]).column)
+    updated_at = meta.get_field('updated_at')
+
+    sql = (
+        f"UPDATE {quote(meta.db_table)} "
+        f"SET {column} = NOT {column}, {quote(updated_at.column)} = %s "
+        f"WHERE {quote(meta.get_field('user').column)} = %s "
+        f"RETURNING {', '.join(quote(field.column) for field in meta.concrete_fields)}"
+    )
+    params = [updated_at.get_db_prep_value(timezone.now(), connection), user_id]
+
+    rows = list(UserNotificationSettings.objects.raw(sql, params))
+    if not rows:
+        # Настроек еще нет: создаем со значениями по умолчанию и переключаем
+        UserNotificationSettings.objects.get_or_create(user_id=user_id)
+        rows = list(UserNotificationSettings.objects.raw(sql, params))
+
+    return rows[0] if rows else None
 
 # ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
 
@@ -210,6 +240,12 @@ async def handle_all_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE)
     query = update.callback_query
     await query.answer()
 
+    # Повторные быстрые нажатия той же кнопки не обрабатываем
+    tap = (update.effective_user.id, query.data)
+    if recent_taps.get(tap):
+        return
+    recent_taps.set(tap, True)
+
     handlers = {
         # Основные кнопки
         "today_menu": show_today_menu,
@@ -236,22 +272,42 @@ async def handle_all_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def _send_or_edit_message(update, message, keyboard=None, **kwargs):
     """Универсальная отправка/редактирование сообщения"""
     reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+    digest = _render_digest(message, reply_markup, kwargs)
 
     if update.callback_query:
-        await update.callback_query.edit_message_text(message, reply_markup=reply_markup, **kwargs)
+        shown = update.callback_query.message
+        key = (shown.chat_id, shown.message_id) if shown else None
+
+        # Сообщение уже выглядит так - не тратим запрос к Telegram
+        if key and rendered_messages.get(key) == digest:
+            return
+
+        try:
+            await update.callback_query.edit_message_text(message, reply_markup=reply_markup, **kwargs)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
     else:
-        await update.message.reply_text(message, reply_markup=reply_markup, **kwargs)
+        shown = await update.message.reply_text(message, reply_markup=reply_markup, **kwargs)
+        key = (shown.chat_id, shown.message_id)
+
+    if key:
+        rendered_messages.set(key, digest)
+
+
+def _render_digest(message, reply_markup, kwargs):
+    """Хэш текста, кнопок и параметров разметки сообщения"""
+    rendered = repr((message, reply_markup.to_json() if reply_markup else None, sorted(kwargs.items())))
+    return hashlib.blake2b(rendered.encode('utf-8'), digest_size=16).digest()
 
 
-@sync_to_async
-def _get_user_settings(telegram_id):
-    """Получение настроек пользователя"""
-    from nutrition_app.models import TelegramUser, UserNotificationSettings
+async def _get_user_settings(telegram_id):
+    """Получение настроек пользователя (из кэша, в БД - только при промахе)"""
     try:
-        telegram_user = TelegramUser.objects.get(telegram_id=telegram_id)
-        return UserNotificationSettings.objects.get_or_create(user=telegram_user.user)[0]
-    except:
+        identity = await get_identity(telegram_id)
+    except Exception:
         return None
+    return identity['settings'] if identity else None
 
 
 async def _build_settings_message(settings):
@@ -269,10 +325,10 @@ async def _build_settings_message(settings):
     )
 
 
-async def _build_status_message(settings, current_time):
+async def _build_status_message(settings):
     """Формирование сообщения статуса"""
     return (
-        f"🔔 *Настройки уведомлений*\n🕐 *Обновлено:* {current_time}\n\n"
+        f"🔔 *Настройки уведомлений*\n\n"
         f"*Текущий статус:*\n"
         f"• Общие: {'ВКЛ' if settings.is_subscribed else 'ВЫКЛ'}\n"
         f"• Утренние: {'ВКЛ' if settings.send_morning_reminder else 'ВЫКЛ'}\n"
@@ -0,0 +1,206 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+from nutrition_app.synthetic import TELEGRAM_ID_BASE, percentiles, temporary_database
+from telegram_bot.fake_telegram import FakeTelegramServer, make_callback_update, make_command_update
+
+# Что нажимает синтетический пользователь: каждый идет по кругу со своего места,
+# так что одна и та же кнопка подряд не повторяется
+SCENARIO = [
+    ('command', '/start'),
+    ('callback', 'today_menu'),
+    ('callback', 'settings'),
+    ('callback', 'toggle_morning'),
+    ('callback', 'notifications_status'),
+    ('callback', 'tomorrow_menu'),
+    ('callback', 'main_menu'),
+    ('command', '/menu'),
+    ('callback', 'help'),
+]
+
+# Изолированный кэш: меню синтетических пользователей не должны попасть в общий
+LOAD_TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+class Command(BaseCommand):
+    help = ('Load-test bot handlers and the reminder wave against a fake Telegram Bot API '
+            'on a temporary database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50,
+                            help='Synthetic users pressing buttons concurrently')
+        parser.add_argument('--presses', type=int, default=10,
+                            help='Updates sent by each user')
+        parser.add_argument('--latency', type=float, default=0.02,
+                            help='Fake Bot API response delay, seconds')
+        parser.add_argument('--flood-every', type=int, default=0,
+                            help='Answer every Nth sendMessage/editMessageText with 429')
+        parser.add_argument('--retry-after', type=int, default=1,
+                            help='retry_after returned with injected 429 responses')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        fake = FakeTelegramServer(
+            latency=options['latency'],
+            flood_every=options['flood_every'],
+            retry_after=options['retry_after'],
+        )
+
+        with fake, temporary_database(), override_settings(
+                TELEGRAM_API_BASE_URL=fake.base_url,
+                TELEGRAM_BOT_TOKEN=settings.TELEGRAM_BOT_TOKEN or '1:load-test',
+                TELEGRAM_REMINDER_DELIVERY='direct',
+                # Метрики синтетической нагрузки не смешиваем с настоящими
+                TELEGRAM_METRICS_DIR='',
+                CACHES=LOAD_TEST_CACHES,
+                TELEGRAM_MENU_CACHE_TTL=60 * 60):
+            self.stdout.write(f"👥 Creating {options['users']} synthetic users...")
+            _create_users(options['users'])
+
+            self.stdout.write('🤖 Handlers (handlers.py)...')
+            self._report_handlers(fake, *asyncio.run(self._run_handlers(fake, options)))
+
+            self.stdout.write('⏰ Reminder wave (tasks.py)...')
+            self._run_wave(fake)
+
+    # ===== ОБРАБОТЧИКИ =====
+
+    async def _run_handlers(self, fake, options):
+        from telegram import Update
+        from telegram_bot.bot import get_application
+
+        application = get_application()
+        errors = []
+
+        async def on_error(update, context):
+            errors.append(context.error)
+
+        application.add_error_handler(on_error)
+        await application.initialize()
+
+        latencies = defaultdict(list)
+        update_ids = iter(range(1, 10 ** 9))
+        rng = random.Random(options['seed'])
+
+        async def user_session(user_id):
+            start = rng.randrange(len(SCENARIO))
+            for press in range(options['presses']):
+                kind, payload = SCENARIO[(start + press) % len(SCENARIO)]
+                if kind == 'command':
+                    data = make_command_update(next(update_ids), user_id, payload)
+                else:
+                    data = make_callback_update(next(update_ids), user_id, payload)
+
+                started = time.perf_counter()
+                await application.process_update(Update.de_json(data, application.bot))
+                latencies[payload].append(time.perf_counter() - started)
+
+        calls_before = len(fake.calls)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                user_session(TELEGRAM_ID_BASE + number)
+                for number in range(options['users'])
+            ))
+        finally:
+            elapsed = time.perf_counter() - started
+            application.remove_error_handler(on_error)
+            await application.shutdown()
+
+        api_calls = fake.calls[calls_before:]
+        return latencies, api_calls, elapsed, errors
+
+    def _report_handlers(self, fake, latencies, api_calls, elapsed, errors):
+        updates = sum(len(values) for values in latencies.values())
+        sends = sum(
+            1 for method, _, _ in api_calls if method in ('sendMessage', 'editMessageText'))
+
+        self.stdout.write(f"{'update':<24}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}")
+        for payload, values in sorted(latencies.items()):
+            summary = percentiles(values)
+            self.stdout.write(
+                f"{payload:<24}{len(values):>7}"
+                f"{summary['p50_ms']:>10.1f}{summary['p99_ms']:>10.1f}")
+
+        summary = percentiles([value for values in latencies.values() for value in values])
+        self.stdout.write(
+            f"{'all':<24}{updates:>7}{summary['p50_ms']:>10.1f}{summary['p99_ms']:>10.1f}")
+        self.stdout.write(
+            f'📊 {updates / elapsed:.1f} updates/s, {sends / elapsed:.1f} sends/s, '
+            f'{len(api_calls)} Bot API calls, {fake.flood_count} injected 429, '
+            f'{len(errors)} handler errors')
+
+    # ===== ВОЛНА НАПОМИНАНИЙ =====
+
+    def _run_wave(self, fake):
+        from nutrition_app.models import UserNotificationSettings
+        from telegram_bot.models import FailedMessage, OutgoingMessage
+        from telegram_bot.tasks import check_all_reminders
+        from telegram_bot.time_utils import minute_bucket
+
+        # Все утренние напоминания наступили прямо сейчас
+        UserNotificationSettings.objects.update(
+            is_subscribed=True,
+            send_morning_reminder=True,
+            next_morning_at=minute_bucket(timezone.now()),
+        )
+
+        calls_before = len(fake.calls)
+        floods_before = fake.flood_count
+        started = time.perf_counter()
+        check_all_reminders()
+        elapsed = time.perf_counter() - started
+
+        # Ответы 429 - попытки, а не доставленные сообщения
+        sent = sum(
+            1 for method, _, _ in fake.calls[calls_before:] if method == 'sendMessage'
+        ) - (fake.flood_count - floods_before)
+        self.stdout.write(
+            f'📊 {sent} reminders sent in {elapsed:.2f}s ({sent / elapsed:.1f} sends/s), '
+            f'deferred to queue: {OutgoingMessage.objects.count()}, '
+            f'failed: {FailedMessage.objects.count()}')
+
+
+def _create_users(count):
+    from django.contrib.auth.hashers import make_password
+    from nutrition_app.models import (
+        CustomUser, Recipe, TelegramUser, UserMealPlan, UserNotificationSettings)
+
+    password = make_password(None)
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'load_user_{number}', password=password)
+        for number in range(count)
+    ])
+
+    TelegramUser.objects.bulk_create([
+        TelegramUser(
+            user=user,
+            telegram_id=TELEGRAM_ID_BASE + number,
+            chat_id=TELEGRAM_ID_BASE + number,
+        )
+        for number, user in enumerate(users)
+    ])
+    UserNotificationSettings.objects.bulk_create([
+        UserNotificationSettings(user=user) for user in users
+    ])
+
+    recipes = Recipe.objects.bulk_create([
+        Recipe(name=f'Блюдо {meal_type}', meal_type=meal_type, calories=400,
+               protein=20, fat=10, carbs=50, ingredients='крупа\nовощи',
+               instructions='Приготовить')
+        for meal_type, _ in Recipe.MEAL_TYPES
+    ])
+
+    today = timezone.localdate()
+    UserMealPlan.objects.bulk_create([
+        UserMealPlan(user=user, date=today, meal_type=recipe.meal_type, recipe=recipe)
+        for user in users
+        for recipe in recipes
+    ])
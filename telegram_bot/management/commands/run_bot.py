@@ -1,14 +1,41 @@
-from django.core.management.base import BaseCommand
-from telegram_bot.bot import application
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from telegram_bot.bot import get_application
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = 'Run Telegram bot in polling mode'
+    help = 'Run Telegram bot in polling mode or register the webhook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--set-webhook', metavar='URL',
+                            help='Register URL (…/telegram/webhook/) as the bot webhook and exit')
+        parser.add_argument('--delete-webhook', action='store_true',
+                            help='Remove the webhook and exit')
 
     def handle(self, *args, **options):
+        if options['set_webhook']:
+            if not settings.TELEGRAM_WEBHOOK_SECRET:
+                raise CommandError('TELEGRAM_WEBHOOK_SECRET is not set')
+
+            asyncio.run(self._call_bot(
+                'set_webhook',
+                url=options['set_webhook'],
+                secret_token=settings.TELEGRAM_WEBHOOK_SECRET,
+                max_connections=settings.TELEGRAM_CONCURRENT_UPDATES,
+            ))
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Webhook set to {options['set_webhook']}"))
+            return
+
+        if options['delete_webhook']:
+            asyncio.run(self._call_bot('delete_webhook'))
+            self.stdout.write(self.style.SUCCESS('✅ Webhook deleted'))
+            return
+
         self.stdout.write(
             self.style.SUCCESS('🚀 Starting Telegram bot in polling mode...')
         )
@@ -17,7 +44,7 @@ class Command(BaseCommand):
 
         try:
 
-            application.run_polling()
+            get_application().run_polling()
 
         except KeyboardInterrupt:
             self.stdout.write(
@@ -29,3 +56,8 @@ class Command(BaseCommand):
             )
             import traceback
             traceback.print_exc()
+
+    async def _call_bot(self, method, **kwargs):
+        bot = get_application().bot
+        async with bot:
+            await getattr(bot, method)(**kwargs)
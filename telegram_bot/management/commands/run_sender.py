@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from telegram_bot.sender import run_sender
+import asyncio
+
+
+class Command(BaseCommand):
+    help = 'Run persistent Telegram sender that drains the outgoing message queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Messages claimed from the queue at once')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            self.style.SUCCESS('🚀 Starting Telegram sender...')
+        )
+        self.stdout.write('⏹️  Press Ctrl+C to stop the sender')
+
+        try:
+            processed = asyncio.run(run_sender(
+                options['batch_size'],
+                options['poll_interval'],
+                stop_when_empty=options['once'],
+                log=self.stdout.write
+            ))
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Queue drained: {processed} messages')
+            )
+
+        except KeyboardInterrupt:
+            self.stdout.write(
+                self.style.WARNING('✅ Sender stopped successfully')
+            )
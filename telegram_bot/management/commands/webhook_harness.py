@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+from telegram_bot.fake_telegram import FakeTelegramServer, make_callback_update, make_command_update
+import asyncio
+import time
+
+HARNESS_SECRET = 'webhook-harness-secret'
+
+# Сценарий не трогает базу данных: только команды и кнопки без обращения к ORM
+SCENARIO = [
+    ('command', '/start'),
+    ('command', '/help'),
+    ('command', '/id'),
+    ('callback', 'help'),
+    ('callback', 'main_menu'),
+    ('callback', 'open_site_info'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Exercise the webhook endpoint offline against a fake Telegram Bot API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20,
+                            help='Synthetic users, each replaying the scenario')
+
+    def handle(self, *args, **options):
+        with FakeTelegramServer() as fake:
+            # Бот строится при первом обновлении - уже внутри подмены API
+            with override_settings(
+                    TELEGRAM_API_BASE_URL=fake.base_url,
+                    TELEGRAM_BOT_TOKEN=settings.TELEGRAM_BOT_TOKEN or '1:webhook-harness',
+                    TELEGRAM_WEBHOOK_SECRET=HARNESS_SECRET,
+                    ALLOWED_HOSTS=['testserver']):
+                elapsed, statuses = asyncio.run(self._run(options['users']))
+
+            expected = options['users'] * len(SCENARIO)
+            # Каждая кнопка - answerCallbackQuery + editMessageText
+            expected_calls = expected + options['users'] * sum(
+                1 for kind, _ in SCENARIO if kind == 'callback')
+            fake.wait_for_calls(expected_calls)
+
+            if any(status != 200 for status in statuses):
+                raise CommandError(f'Webhook answered with {set(statuses)}')
+
+            self.stdout.write(f'📨 Updates posted: {expected} in {elapsed:.2f}s')
+            self.stdout.write(
+                f"🤖 Bot API calls: sendMessage={len(fake.calls_to('sendMessage'))}, "
+                f"editMessageText={len(fake.calls_to('editMessageText'))}, "
+                f"answerCallbackQuery={len(fake.calls_to('answerCallbackQuery'))}"
+            )
+
+            if len(fake.calls) < expected_calls:
+                raise CommandError(
+                    f'Expected {expected_calls} Bot API calls, got {len(fake.calls)}')
+
+        self.stdout.write(self.style.SUCCESS('✅ Webhook mode works'))
+
+    async def _run(self, users):
+        client = AsyncClient()
+        headers = {'X-Telegram-Bot-Api-Secret-Token': HARNESS_SECRET}
+
+        # Без секрета запрос должен отклоняться
+        response = await client.post(
+            '/telegram/webhook/', make_command_update(0, 1, '/start'),
+            content_type='application/json')
+        if response.status_code != 403:
+            raise CommandError('Webhook accepted a request without the secret token')
+
+        updates = []
+        update_id = 1
+        for user_id in range(1, users + 1):
+            for kind, payload in SCENARIO:
+                if kind == 'command':
+                    updates.append(make_command_update(update_id, user_id, payload))
+                else:
+                    updates.append(make_callback_update(update_id, user_id, payload))
+                update_id += 1
+
+        started = time.monotonic()
+        responses = await asyncio.gather(*(
+            client.post('/telegram/webhook/', update,
+                        content_type='application/json', headers=headers)
+            for update in updates
+        ))
+        elapsed = time.monotonic() - started
+
+        # Даем фоновой обработке закончить, пока живет event loop
+        from telegram_bot.bot import get_application
+        application = get_application()
+        while not application.update_queue.empty():
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        await application.stop()
+        await application.shutdown()
+
+        return elapsed, [response.status_code for response in responses]
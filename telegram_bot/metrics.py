@@ -0,0 +1,329 @@
+"""Метрики конвейера напоминаний в формате Prometheus.
+
+Счетчики и гистограммы живут в памяти процесса. flush() сохраняет их
+в TELEGRAM_METRICS_DIR (файл на процесс), а collect() складывает файлы
+всех процессов - воркеров Celery, демона отправки - в один текст
+для эндпоинта /telegram/metrics/.
+
+Файл процесса называется <pid>-<время запуска>.json: новый процесс с тем
+же pid пишет в свой файл и не затирает чужие значения. Файлы завершившихся
+процессов collect() переносит в общий retired.json, чтобы счетчики
+не уменьшались, а файлов не становилось все больше.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: файлы завершившихся процессов не убираем
+    fcntl = None
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_registry = {}
+_lock = threading.Lock()
+
+# Сюда складываются значения завершившихся процессов
+RETIRED_FILE = 'retired.json'
+LOCK_FILE = '.lock'
+
+# (pid, метка запуска) текущего процесса; после fork пересчитывается
+_process = (None, None)
+
+
+class Counter:
+    """Монотонно растущий счетчик"""
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self, labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dump(self):
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Histogram:
+    """Распределение значений по корзинам (сумма и количество - как в Prometheus)"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(self, labels)
+        with _lock:
+            counts, total, count = self.values.get(key, ([0] * len(self.buckets), 0, 0))
+            index = bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    def dump(self):
+        return [[list(key), [counts, total, count]]
+                for key, (counts, total, count) in self.values.items()]
+
+
+def _label_key(metric, labels):
+    return tuple(str(labels.get(name, '')) for name in metric.labelnames)
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def _register(metric):
+    with _lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+# ===== СОХРАНЕНИЕ И СБОР =====
+
+
+def snapshot():
+    """Текущие значения метрик процесса в виде, пригодном для JSON"""
+    with _lock:
+        return {
+            name: {
+                'type': metric.type,
+                'documentation': metric.documentation,
+                'labelnames': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'values': metric.dump(),
+            }
+            for name, metric in _registry.items()
+        }
+
+
+def _start_marker(pid):
+    """Метка запуска процесса: отличает его от более позднего процесса с тем же pid.
+
+    В Linux - время запуска из /proc/<pid>/stat (тики с загрузки системы),
+    иначе None.
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as stat_file:
+            return stat_file.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _process_file_name():
+    global _process
+    pid = os.getpid()
+    if _process[0] != pid:
+        # Без /proc метка - время первой записи; такой файл считается живым, пока жив pid
+        _process = (pid, _start_marker(pid) or f't{int(time.time())}')
+    return f'{_process[0]}-{_process[1]}.json'
+
+
+def _is_alive(file_name):
+    """Жив ли процесс, записавший файл <pid>-<метка>.json"""
+    pid, _, marker = file_name[:-len('.json')].partition('-')
+    try:
+        pid = int(pid)
+    except ValueError:
+        # Файл чужого формата не трогаем
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Процесс есть, но чужой
+
+    return not marker or marker.startswith('t') or _start_marker(pid) in (None, marker)
+
+
+def flush():
+    """Записывает метрики процесса в TELEGRAM_METRICS_DIR (атомарно)"""
+    directory = settings.TELEGRAM_METRICS_DIR
+    if not directory:
+        return
+
+    os.makedirs(directory, exist_ok=True)
+    _write(os.path.join(directory, _process_file_name()), snapshot())
+
+
+def _write(path, data):
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(handle, 'w') as temp_file:
+        json.dump(data, temp_file)
+    os.replace(temp_path, path)
+
+
+def _read(path):
+    try:
+        with open(path) as metrics_file:
+            return json.load(metrics_file)
+    except (OSError, ValueError):
+        return None
+
+
+def collect():
+    """Метрики всех процессов, сложенные вместе, в текстовом формате Prometheus"""
+    snapshots = []
+    directory = settings.TELEGRAM_METRICS_DIR
+
+    if directory and os.path.isdir(directory):
+        if fcntl:
+            _retire_dead_processes(directory)
+
+        own_file = _process_file_name()
+        for file_name in os.listdir(directory):
+            if file_name.endswith('.json') and file_name != own_file:
+                data = _read(os.path.join(directory, file_name))
+                if data is not None:
+                    snapshots.append(data)
+
+    # Текущий процесс - по живым значениям, а не по последнему flush
+    snapshots.append(snapshot())
+
+    return render(_merge(snapshots))
+
+
+def _retire_dead_processes(directory):
+    """Переносит значения завершившихся процессов в retired.json и удаляет их файлы.
+
+    Под блокировкой: два одновременных сбора не сложат один файл дважды.
+    """
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        dead = [
+            file_name for file_name in os.listdir(directory)
+            if file_name.endswith('.json') and file_name != RETIRED_FILE
+            and not _is_alive(file_name)
+        ]
+        if not dead:
+            return
+
+        retired_path = os.path.join(directory, RETIRED_FILE)
+        snapshots = [_read(retired_path) or {}]
+        snapshots += [_read(os.path.join(directory, file_name)) or {} for file_name in dead]
+        _write(retired_path, _dump(_merge(snapshots)))
+
+        for file_name in dead:
+            os.remove(os.path.join(directory, file_name))
+
+
+def _dump(merged):
+    """Результат _merge обратно в формат snapshot()"""
+    return {
+        name: {**metric, 'values': [[list(key), value] for key, value in metric['values'].items()]}
+        for name, metric in merged.items()
+    }
+
+
+def _merge(snapshots):
+    merged = {}
+    for metrics in snapshots:
+        for name, metric in metrics.items():
+            target = merged.setdefault(name, {**metric, 'values': {}})
+            for key, value in metric['values']:
+                key = tuple(key)
+                if metric['type'] == 'counter':
+                    target['values'][key] = target['values'].get(key, 0) + value
+                else:
+                    counts, total, count = target['values'].get(
+                        key, ([0] * len(metric['buckets']), 0, 0))
+                    target['values'][key] = (
+                        [a + b for a, b in zip(counts, value[0])],
+                        total + value[1],
+                        count + value[2],
+                    )
+    return merged
+
+
+def render(metrics):
+    lines = []
+    for name, metric in sorted(metrics.items()):
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+
+        for key, value in sorted(metric['values'].items()):
+            labels = list(zip(metric['labelnames'], key))
+
+            if metric['type'] == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(metric['buckets'], counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{name}_bucket{_format_labels(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# ===== МЕТРИКИ КОНВЕЙЕРА НАПОМИНАНИЙ =====
+
+REMINDER_TICKS = counter(
+    'telegram_reminder_ticks_total', 'Reminder beat ticks')
+REMINDER_TICK_SECONDS = histogram(
+    'telegram_reminder_tick_seconds', 'Duration of a reminder beat tick')
+REMINDER_SHARD_SECONDS = histogram(
+    'telegram_reminder_shard_seconds', 'Duration of a reminder shard task')
+REMINDER_SHARD_FAILURES = counter(
+    'telegram_reminder_shard_failures_total', 'Reminder shards that raised')
+REMINDER_USERS_SCANNED = counter(
+    'telegram_reminder_users_scanned_total', 'Notification settings rows claimed by shards')
+REMINDERS_DUE = counter(
+    'telegram_reminders_due_total', 'Reminders whose slot has come', ['type'])
+REMINDERS_SKIPPED = counter(
+    'telegram_reminders_skipped_total', 'Due reminders that were not sent', ['type', 'reason'])
+REMINDER_ERRORS = counter(
+    'telegram_reminder_errors_total', 'Reminders that failed to render', ['type'])
+
+# Задержка от назначенной минуты до ответа Telegram: секунды в норме, минуты - когда не успеваем
+REMINDER_DELAY_BUCKETS = (1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600)
+REMINDER_DELAY_SECONDS = histogram(
+    'telegram_reminder_delay_seconds', 'Delay between reminder slot and Telegram acknowledgement',
+    ['type', 'shard'], buckets=REMINDER_DELAY_BUCKETS)
+REMINDER_DELAY_ALERTS = counter(
+    'telegram_reminder_delay_alerts_total',
+    'Reminders acknowledged later than TELEGRAM_REMINDER_DELAY_ALERT', ['type'])
+
+MESSAGES = counter(
+    'telegram_messages_total', 'Outgoing messages by send result', ['status'])
+FLOOD_WAITS = counter(
+    'telegram_flood_waits_total', 'RetryAfter (429) answers from Telegram')
+SEND_SECONDS = histogram(
+    'telegram_send_seconds', 'Duration of a sendMessage call')
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_bot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FailedMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.BigIntegerField(verbose_name='Chat ID')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('parse_mode', models.CharField(blank=True, default='Markdown', max_length=20, verbose_name='Разметка')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('failed_at', models.DateTimeField(auto_now_add=True, verbose_name='Время ошибки')),
+            ],
+            options={
+                'verbose_name': 'Неотправленное сообщение',
+                'verbose_name_plural': 'Неотправленные сообщения',
+            },
+        ),
+        migrations.AddField(
+            model_name='outgoingmessage',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0, verbose_name='Попыток'),
+        ),
+        migrations.AddField(
+            model_name='outgoingmessage',
+            name='last_error',
+            field=models.TextField(blank=True, verbose_name='Последняя ошибка'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('telegram_bot', '0002_outgoing_retries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outgoingmessage',
+            name='reminder_type',
+            field=models.CharField(blank=True, max_length=20, verbose_name='Тип напоминания'),
+        ),
+        migrations.AddField(
+            model_name='outgoingmessage',
+            name='shard',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Шард'),
+        ),
+        migrations.AddField(
+            model_name='outgoingmessage',
+            name='slot',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Слот напоминания'),
+        ),
+    ]
@@ -1,3 +1,47 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class OutgoingMessage(models.Model):
+    """Очередь сообщений, которую разбирает демон отправки (run_sender)"""
+    chat_id = models.BigIntegerField(verbose_name="Chat ID")
+    text = models.TextField(verbose_name="Текст")
+    parse_mode = models.CharField(
+        max_length=20, blank=True, default='Markdown', verbose_name="Разметка")
+    # Когда сообщение можно брать в работу. Взятое сообщение откладывается
+    # на время аренды: если демон упадет, сообщение вернется в очередь
+    available_at = models.DateTimeField(
+        default=timezone.now, db_index=True, verbose_name="Доступно с")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    # Для напоминаний: на какую минуту оно было назначено и кто его собрал.
+    # По ним считается задержка от слота до ответа Telegram
+    slot = models.DateTimeField(null=True, blank=True, verbose_name="Слот напоминания")
+    reminder_type = models.CharField(max_length=20, blank=True, verbose_name="Тип напоминания")
+    shard = models.IntegerField(null=True, blank=True, verbose_name="Шард")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Сообщение в {self.chat_id} ({self.created_at})"
+
+    class Meta:
+        verbose_name = "Исходящее сообщение"
+        verbose_name_plural = "Исходящие сообщения"
+
+
+class FailedMessage(models.Model):
+    """Сообщения, которые не удалось отправить (dead-letter)"""
+    chat_id = models.BigIntegerField(verbose_name="Chat ID")
+    text = models.TextField(verbose_name="Текст")
+    parse_mode = models.CharField(
+        max_length=20, blank=True, default='Markdown', verbose_name="Разметка")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    failed_at = models.DateTimeField(auto_now_add=True, verbose_name="Время ошибки")
+
+    def __str__(self):
+        return f"Не отправлено в {self.chat_id}: {self.error}"
+
+    class Meta:
+        verbose_name = "Неотправленное сообщение"
+        verbose_name_plural = "Неотправленные сообщения"
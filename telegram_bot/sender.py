@@ -0,0 +1,198 @@
+import asyncio
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from telegram_bot import metrics
+from telegram_bot.db import db_sync_to_async
+from telegram_bot.dispatcher import DEFERRED, FAILED, SENT, create_limits, pooled_bot, send_batch
+from telegram_bot.models import FailedMessage, OutgoingMessage
+
+
+def _reminder_fields(message):
+    """Слот, тип и шард напоминания - едут с сообщением до самой отправки"""
+    return {
+        'slot': message.get('slot'),
+        'reminder_type': message.get('reminder_type', ''),
+        'shard': message.get('shard'),
+    }
+
+
+def enqueue_messages(messages):
+    """Кладет сообщения в очередь демона отправки одним INSERT"""
+    OutgoingMessage.objects.bulk_create(
+        [
+            OutgoingMessage(
+                chat_id=message['chat_id'],
+                text=message['text'],
+                parse_mode=message.get('parse_mode', 'Markdown') or '',
+                **_reminder_fields(message)
+            )
+            for message in messages
+        ],
+        batch_size=1000
+    )
+    return len(messages)
+
+
+def requeue_messages(deferred):
+    """Возвращает в очередь сообщения, отложенные из-за лимитов или сети.
+
+    deferred - пары (сообщение, результат отправки).
+    """
+    now = timezone.now()
+    OutgoingMessage.objects.bulk_create(
+        [
+            OutgoingMessage(
+                chat_id=message['chat_id'],
+                text=message['text'],
+                parse_mode=message.get('parse_mode', 'Markdown') or '',
+                available_at=now + timedelta(seconds=result['delay']),
+                attempts=result['attempts'],
+                last_error=result.get('error', ''),
+                **_reminder_fields(message)
+            )
+            for message, result in deferred
+        ],
+        batch_size=1000
+    )
+
+
+def record_failures(failed):
+    """Сохраняет сообщения с постоянными ошибками в таблицу неотправленных.
+
+    failed - пары (сообщение, результат отправки).
+    """
+    FailedMessage.objects.bulk_create(
+        [
+            FailedMessage(
+                chat_id=message['chat_id'],
+                text=message['text'],
+                parse_mode=message.get('parse_mode', 'Markdown') or '',
+                attempts=result['attempts'],
+                error=result.get('error', '')
+            )
+            for message, result in failed
+        ],
+        batch_size=1000
+    )
+
+
+def claim_size(batch_size, rate):
+    """Сколько сообщений брать, чтобы успеть отправить их до конца аренды.
+
+    rate - текущая скорость отправки, сообщений в секунду (после 429 она
+    падает). Часть аренды оставляем на повторы и паузы флуд-контроля,
+    иначе другой демон заберет и повторно отправит еще не отправленные строки.
+    """
+    budget = settings.TELEGRAM_SENDER_LEASE - settings.TELEGRAM_SENDER_LEASE_MARGIN
+    return max(1, min(batch_size, int(budget * rate)))
+
+
+def claim_batch(batch_size):
+    """Берем пачку доступных сообщений и откладываем их на время аренды"""
+    now = timezone.now()
+
+    with transaction.atomic():
+        batch = list(
+            OutgoingMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        OutgoingMessage.objects.filter(id__in=[message.id for message in batch]).update(
+            available_at=now + timedelta(seconds=settings.TELEGRAM_SENDER_LEASE)
+        )
+
+    return batch
+
+
+def as_message(row):
+    """Строка очереди в формате словаря для отправки"""
+    return {
+        'chat_id': row.chat_id,
+        'text': row.text,
+        'parse_mode': row.parse_mode,
+        'attempts': row.attempts,
+        'slot': row.slot,
+        'reminder_type': row.reminder_type,
+        'shard': row.shard,
+    }
+
+
+def delete_messages(rows):
+    """Удаляет взятые строки из очереди"""
+    OutgoingMessage.objects.filter(id__in=[row.id for row in rows]).delete()
+
+
+@db_sync_to_async
+def _complete(batch, results):
+    """Разбираем результаты пачки: отправленные удаляем, отложенные
+    переносим, постоянные ошибки перекладываем в таблицу неотправленных"""
+    now = timezone.now()
+    deferred = []
+    failed = []
+
+    for message, result in zip(batch, results):
+        message.attempts = result['attempts']
+        message.last_error = result.get('error', '')
+
+        if result['status'] == DEFERRED:
+            message.available_at = now + timedelta(seconds=result['delay'])
+            deferred.append(message)
+        elif result['status'] == FAILED:
+            failed.append(message)
+
+    with transaction.atomic():
+        OutgoingMessage.objects.bulk_update(
+            deferred, ['available_at', 'attempts', 'last_error'])
+
+        FailedMessage.objects.bulk_create([
+            FailedMessage(
+                chat_id=message.chat_id,
+                text=message.text,
+                parse_mode=message.parse_mode,
+                attempts=message.attempts,
+                error=message.last_error
+            )
+            for message in failed
+        ])
+
+        deferred_ids = {message.id for message in deferred}
+        OutgoingMessage.objects.filter(
+            id__in=[message.id for message in batch if message.id not in deferred_ids]
+        ).delete()
+
+
+async def run_sender(batch_size, poll_interval, stop_when_empty=False, log=print):
+    """Основной цикл демона: один event loop и один теплый пул соединений"""
+    semaphore, limiter = create_limits()
+    processed = 0
+
+    async with pooled_bot() as bot:
+        while True:
+            batch = await db_sync_to_async(claim_batch)(
+                claim_size(batch_size, limiter.global_bucket.rate))
+
+            if not batch:
+                if stop_when_empty:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+
+            results = await send_batch(
+                bot, semaphore, limiter, [as_message(row) for row in batch])
+
+            await _complete(batch, results)
+            processed += len(batch)
+            metrics.flush()
+
+            statuses = [result['status'] for result in results]
+            log(
+                f"📨 Отправлено {statuses.count(SENT)}/{len(batch)}, "
+                f"отложено {statuses.count(DEFERRED)}, ошибок {statuses.count(FAILED)} "
+                f"(всего обработано: {processed})")
+
+    return processed
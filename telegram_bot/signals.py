@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from nutrition_app.models import Recipe, TelegramUser, UserMealPlan, UserNotificationSettings
+from .cache import invalidate_all_menus, invalidate_menu, invalidate_telegram_id, invalidate_user
+
+
+@receiver([post_save, post_delete], sender=TelegramUser)
+def telegram_user_changed(sender, instance, **kwargs):
+    """Сбрасываем кэш привязки Telegram-аккаунта"""
+    invalidate_telegram_id(instance.telegram_id)
+    invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserNotificationSettings)
+def notification_settings_changed(sender, instance, **kwargs):
+    """Сбрасываем кэш настроек уведомлений"""
+    invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserMealPlan)
+def meal_plan_changed(sender, instance, **kwargs):
+    """Сбрасываем готовое меню пользователя на дату плана"""
+    invalidate_menu(instance.user_id, instance.date)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    """Рецепт может быть в любом меню - сбрасываем все"""
+    invalidate_all_menus()
@@ -1,119 +1,500 @@
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
 from celery import shared_task
-from nutrition_app.models import TelegramUser, UserMealPlan, UserNotificationSettings
-from telegram_bot.bot import application
-from telegram_bot.time_utils import is_reminder_time
-from asgiref.sync import sync_to_async
-import asyncio
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.utils import timezone
+from nutrition_app.models import ReminderDelivery, UserMealPlan, UserNotificationSettings, UserProfile
+from telegram_bot import metrics
+from telegram_bot.cache import cache_menus, get_cached_menus
+from telegram_bot.time_utils import get_zone, minute_bucket, next_reminder_time
+
+logger = logging.getLogger(__name__)
+
+EVENING_REMINDER_MESSAGE = (
+    "🌙 *Добрый вечер!*\n\n"
+    "Не забудьте внести все приемы пищи за сегодня в дневник! 📝\n\n"
+    "*Команды бота:*\n"
+    "/menu - Посмотреть сегодняшнее меню\n"
+    "/notifications - Управление уведомлениями\n\n"
+    "Спокойной ночи! 😴"
+)
+
+REMINDER_TYPES = ('morning', 'evening')
+
+# Сколько пользователей в одном запросе предзагрузки планов
+PRELOAD_BATCH_SIZE = 500
+
+# Сколько отложенных сообщений досылать за тик в режиме direct
+QUEUE_BATCH_SIZE = 500
+
+# Сколько недельных отчетов собирать и отправлять одной пачкой
+WEEKLY_REPORT_BATCH_SIZE = 1000
+
+# Норма калорий для пользователей без профиля
+DEFAULT_DAILY_CALORIES = UserProfile._meta.get_field('daily_calories').default
 
 
 @shared_task
 def check_all_reminders():
-    """Проверяем и отправляем все уведомления"""
+    """Проверяем наступившие уведомления и раздаем их шардам.
+
+    Пользователи делятся на шарды по диапазонам id (TELEGRAM_REMINDER_SHARD_SIZE),
+    каждый шард - отдельная задача process_reminder_shard. С настоящим брокером
+    шарды разбирают параллельно все воркеры, в eager-режиме они выполняются
+    здесь же по очереди.
+    """
     print("🎯 Celery: НАЧАЛО ПРОВЕРКИ УВЕДОМЛЕНИЙ")
+    started = time.monotonic()
 
-    telegram_users = TelegramUser.objects.select_related(
-        'user', 'user__notification_settings'
-    ).all()
+    # Время берем один раз на весь тик
+    bucket = minute_bucket(timezone.now())
 
-    print(f"🔍 ВСЕГО Telegram пользователей в базе: {telegram_users.count()}")
+    _schedule_new_reminders(bucket)
 
-    for telegram_user in telegram_users:
+    shard_size = settings.TELEGRAM_REMINDER_SHARD_SIZE
+    shards = sorted(_due_shards(bucket, shard_size))
+
+    for shard in shards:
+        first_user_id = shard * shard_size
         try:
-            print(
-                f"👤 Проверяем: {telegram_user.user.username} (ID: {telegram_user.telegram_id})")
+            process_reminder_shard.delay(
+                first_user_id, first_user_id + shard_size, bucket.isoformat())
+        except Exception as e:
+            # Ошибка одного шарда не мешает остальным
+            print(f"❌ Шард {first_user_id}-{first_user_id + shard_size - 1}: {e}")
 
-            settings = telegram_user.user.notification_settings
+    if settings.TELEGRAM_REMINDER_DELIVERY == 'direct':
+        _send_deferred_messages()
 
-            if not settings.is_subscribed:
-                print("   ⏭️  Пропускаем - уведомления выключены")
-                continue
+    metrics.REMINDER_TICKS.inc()
+    metrics.REMINDER_TICK_SECONDS.observe(time.monotonic() - started)
+    metrics.flush()
 
-            # Утреннее напоминание
-            if is_reminder_time(telegram_user.user, 'morning') and settings.send_morning_reminder:
-                print(f"   📨 ОТПРАВЛЯЕМ УТРЕННЕЕ УВЕДОМЛЕНИЕ!")
-                # Запускаем асинхронную задачу
-                asyncio.run(send_morning_reminder_async(telegram_user))
+    print(f"✅ ПРОВЕРКА ЗАВЕРШЕНА. Шардов с напоминаниями: {len(shards)}")
 
-            # Вечернее напоминание
-            if is_reminder_time(telegram_user.user, 'evening') and settings.send_evening_reminder:
-                print(f"   📨 ОТПРАВЛЯЕМ ВЕЧЕРНЕЕ УВЕДОМЛЕНИЕ!")
-                # Запускаем асинхронную задачу
-                asyncio.run(send_evening_reminder_async(telegram_user))
 
-        except Exception as e:
-            print(f"❌ Ошибка у {telegram_user.user.username}: {e}")
+@shared_task
+def process_reminder_shard(first_user_id, last_user_id, bucket):
+    """Отправляем наступившие напоминания пользователям с id в [first_user_id, last_user_id)"""
+    started = time.monotonic()
+    try:
+        return _process_reminder_shard(first_user_id, last_user_id, bucket, started)
+    except Exception:
+        metrics.REMINDER_SHARD_FAILURES.inc()
+        raise
+    finally:
+        metrics.REMINDER_SHARD_SECONDS.observe(time.monotonic() - started)
+        metrics.flush()
+
+
+def _process_reminder_shard(first_user_id, last_user_id, bucket, started):
+    # python-telegram-bot импортируем только там, где действительно отправляем
+    from telegram_bot.dispatcher import send_messages
+    from telegram_bot.sender import enqueue_messages
+
+    queue = settings.TELEGRAM_REMINDER_DELIVERY == 'queue'
+
+    # Перенос времени напоминаний, журнал отправок и сборка текстов - одна
+    # транзакция: если шард упадет до отправки, напоминания останутся
+    # наступившими и уйдут на следующем тике
+    with transaction.atomic():
+        due, outgoing = _prepare_reminders(first_user_id, last_user_id, bucket)
+
+        if queue:
+            # Отправит демон run_sender с постоянным пулом соединений
+            sent = enqueue_messages(outgoing)
+
+    if not queue:
+        # Сетевые ошибки не роняют пачку: отложенные сообщения уходят
+        # в очередь, постоянные ошибки - в таблицу неотправленных
+        sent = send_messages(outgoing)
+
+    action = 'поставлено в очередь' if queue else 'отправлено'
+    elapsed = time.monotonic() - started
+    print(
+        f"📦 Шард {first_user_id}-{last_user_id - 1}: наступивших напоминаний {len(due)}, "
+        f"{action} {sent}/{len(outgoing)} за {elapsed:.2f}с")
+
+    return {
+        'first_user_id': first_user_id,
+        'last_user_id': last_user_id,
+        'due': len(due),
+        'sent': sent,
+        'seconds': elapsed,
+    }
 
-    print("✅ ПРОВЕРКА ЗАВЕРШЕНА")
 
+def _prepare_reminders(first_user_id, last_user_id, bucket):
+    """Забираем наступившие напоминания шарда и собираем сообщения.
+
+    Вызывается внутри транзакции. Возвращает (наступившие напоминания, сообщения).
+    """
+    now = timezone.now()
+    bucket = datetime.fromisoformat(bucket)
+    grace_period = timedelta(seconds=settings.TELEGRAM_REMINDER_GRACE_PERIOD)
+    shard = first_user_id // settings.TELEGRAM_REMINDER_SHARD_SIZE
+
+    # Отбираем напоминания, которые действительно нужно отправить
+    due = _claim_due_reminders(bucket, first_user_id, last_user_id)
+    metrics.REMINDER_USERS_SCANNED.inc(len({
+        notification_settings.user_id for notification_settings, _, _ in due}))
+
+    candidates = []
+    for notification_settings, reminder_type, due_at in due:
+        metrics.REMINDERS_DUE.inc(type=reminder_type)
+
+        if not notification_settings.is_subscribed:
+            reason = 'unsubscribed'
+        elif not getattr(notification_settings, f'send_{reminder_type}_reminder'):
+            reason = 'disabled'
+        elif not hasattr(notification_settings.user, 'telegram'):
+            reason = 'no_telegram'
+        # Напоминание сильно опоздало (например, воркер был выключен)
+        elif now - due_at > grace_period:
+            reason = 'late'
+        else:
+            candidates.append((notification_settings, reminder_type, due_at))
+            continue
 
-async def send_morning_reminder_async(telegram_user):
-    """Асинхронная отправка утреннего напоминания"""
-    try:
-        from django.utils import timezone
+        metrics.REMINDERS_SKIPPED.inc(type=reminder_type, reason=reason)
 
-        today = timezone.now().date()
+    # Отправляем только те слоты, которые этот шард первым записал в журнал
+    claimed = _claim_delivery_slots(candidates)
+    for notification_settings, reminder_type, due_at in set(candidates) - set(claimed):
+        metrics.REMINDERS_SKIPPED.inc(type=reminder_type, reason='duplicate')
+    candidates = claimed
 
-        # Асинхронно получаем план питания
-        meal_plans = await sync_to_async(list)(
-            UserMealPlan.objects.filter(
-                user=telegram_user.user,
-                date=today
-            ).select_related('recipe')
-        )
+    morning_messages = _morning_messages([
+        (notification_settings.user_id, _local_date(notification_settings, due_at))
+        for notification_settings, reminder_type, due_at in candidates
+        if reminder_type == 'morning'
+    ])
 
-        if meal_plans:
-            # Если есть план - показываем его
-            message = generate_daily_menu_message(meal_plans, today)
-        else:
-            # Если плана нет - напоминаем составить
-            message = (
-                f"🌅 *Доброе утро!*\n\n"
-                f"На {today.strftime('%d.%m.%Y')} у вас нет плана питания.\n\n"
-                f"Составьте план на день для достижения ваших целей! 💪\n\n"
-                f"*Команды бота:*\n"
-                f"/menu - Посмотреть меню\n"
-                f"/notifications - Настройки уведомлений"
-            )
+    # Сначала собираем все сообщения, потом отправляем их одной пачкой
+    outgoing = []
+    for notification_settings, reminder_type, due_at in candidates:
+        user = notification_settings.user
+
+        try:
+            if reminder_type == 'morning':
+                text = morning_messages[
+                    (user.id, _local_date(notification_settings, due_at))]
+            else:
+                text = EVENING_REMINDER_MESSAGE
 
-        await send_telegram_message_async(telegram_user.chat_id, message)
-        print(
-            f"✅ Утреннее уведомление отправлено для {telegram_user.user.username}")
+            # Слот едет с сообщением до ответа Telegram - так считается задержка
+            outgoing.append({
+                'chat_id': user.telegram.chat_id,
+                'text': text,
+                'slot': due_at,
+                'reminder_type': reminder_type,
+                'shard': shard,
+            })
 
-    except Exception as e:
-        print(f"❌ Ошибка отправки утреннего уведомления: {e}")
+        except Exception:
+            # Один сломанный пользователь не должен держать весь шард
+            metrics.REMINDER_ERRORS.inc(type=reminder_type)
+            logger.exception("Reminder for user %s failed", user.pk)
 
+    return due, outgoing
 
-async def send_evening_reminder_async(telegram_user):
-    """Асинхронная отправка вечернего напоминания"""
-    try:
-        message = (
-            "🌙 *Добрый вечер!*\n\n"
-            "Не забудьте внести все приемы пищи за сегодня в дневник! 📝\n\n"
-            "*Команды бота:*\n"
-            "/menu - Посмотреть сегодняшнее меню\n"
-            "/notifications - Управление уведомлениями\n\n"
-            "Спокойной ночи! 😴"
+
+@shared_task
+def purge_reminder_deliveries():
+    """Удаляем старые записи журнала отправленных напоминаний"""
+    border = timezone.now() - timedelta(
+        days=settings.TELEGRAM_REMINDER_LEDGER_RETENTION_DAYS)
+    deleted, _ = ReminderDelivery.objects.filter(slot__lt=border).delete()
+    print(f"🧹 Удалено записей журнала напоминаний: {deleted}")
+
+
+@shared_task
+def send_weekly_reports():
+    """Воскресные итоги недели для всех подписчиков.
+
+    Итоги всех пользователей считает один сгруппированный запрос по планам
+    питания с рецептами; строки читаются потоком и уходят пачками
+    в тот же отправщик, что и напоминания.
+    """
+    started = time.monotonic()
+    week_end = timezone.localdate()
+    week_start = week_end - timedelta(days=week_end.weekday())
+    # Слот отчета - полночь понедельника: один отчет на пользователя за неделю
+    slot = timezone.make_aware(datetime.combine(week_start, datetime.min.time()))
+
+    from telegram_bot.dispatcher import send_messages
+    from telegram_bot.sender import enqueue_messages
+
+    deliver = enqueue_messages if settings.TELEGRAM_REMINDER_DELIVERY == 'queue' else send_messages
+
+    rows = _weekly_totals(week_start, week_end).iterator(chunk_size=WEEKLY_REPORT_BATCH_SIZE)
+    users = 0
+    delivered = 0
+
+    while batch := list(islice(rows, WEEKLY_REPORT_BATCH_SIZE)):
+        claimed = _claim_slots([(row['user_id'], 'weekly', slot) for row in batch])
+        outgoing = [
+            {
+                'chat_id': row['user__telegram__chat_id'],
+                'text': build_weekly_report_message(row, week_start, week_end),
+            }
+            for row in batch
+            if (row['user_id'], 'weekly', slot) in claimed
+        ]
+        users += len(batch)
+        delivered += deliver(outgoing)
+
+    print(
+        f"📊 Недельные отчеты: пользователей с планами {users}, "
+        f"отправлено {delivered} за {time.monotonic() - started:.2f}с")
+
+
+def _weekly_totals(week_start, week_end):
+    """Итоги недели по каждому подписчику с Telegram - одним GROUP BY"""
+    def planned(field):
+        return Sum(F(f'recipe__{field}') * F('portion_multiplier'), output_field=FloatField())
+
+    return (
+        UserMealPlan.objects
+        .filter(
+            date__range=(week_start, week_end),
+            user__notification_settings__is_subscribed=True,
+            user__telegram__isnull=False,
+        )
+        .values('user_id', 'user__telegram__chat_id', 'user__profile__daily_calories')
+        .annotate(
+            calories=planned('calories'),
+            protein=planned('protein'),
+            fat=planned('fat'),
+            carbs=planned('carbs'),
+            days=Count('date', distinct=True),
         )
+        .order_by('user_id')
+    )
+
+
+def build_weekly_report_message(totals, week_start, week_end):
+    """Текст недельного отчета по строке итогов _weekly_totals"""
+    daily_calories = totals['user__profile__daily_calories'] or DEFAULT_DAILY_CALORIES
+    average = totals['calories'] / totals['days']
+    percent = average / daily_calories * 100
+
+    return (
+        f"📊 *Итоги недели {week_start.strftime('%d.%m')}–{week_end.strftime('%d.%m.%Y')}*\n\n"
+        f"Дней с планом питания: {totals['days']} из 7\n\n"
+        f"*Запланировано за неделю:*\n"
+        f"• Калории: {totals['calories']:.0f} ккал\n"
+        f"• Белки: {totals['protein']:.1f}г\n"
+        f"• Жиры: {totals['fat']:.1f}г\n"
+        f"• Углеводы: {totals['carbs']:.1f}г\n\n"
+        f"🎯 В среднем {average:.0f} ккал в день при норме {daily_calories} ккал ({percent:.0f}%)\n\n"
+        f"Хорошей новой недели! 💪"
+    )
+
+
+def _claim_delivery_slots(candidates):
+    """Записываем слоты в журнал одним INSERT и оставляем только свои"""
+    claimed = _claim_slots([
+        (notification_settings.user_id, reminder_type, due_at)
+        for notification_settings, reminder_type, due_at in candidates
+    ])
+
+    return [
+        (notification_settings, reminder_type, due_at)
+        for notification_settings, reminder_type, due_at in candidates
+        if (notification_settings.user_id, reminder_type, due_at) in claimed
+    ]
+
+
+def _claim_slots(slots):
+    """Записывает тройки (user_id, тип, слот) в журнал и возвращает доставшиеся нам.
+
+    Уникальный ключ (user, reminder_type, slot) не пустит вторую запись,
+    поэтому повторный тик, ретрай или параллельный воркер слот не получат.
+    """
+    if not slots:
+        return set()
+
+    claim_token = uuid.uuid4()
+    ReminderDelivery.objects.bulk_create(
+        [
+            ReminderDelivery(
+                user_id=user_id,
+                reminder_type=reminder_type,
+                slot=slot,
+                claim_token=claim_token
+            )
+            for user_id, reminder_type, slot in slots
+        ],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+    return set(
+        ReminderDelivery.objects.filter(claim_token=claim_token)
+        .values_list('user_id', 'reminder_type', 'slot')
+    )
+
+
+def _local_date(notification_settings, moment):
+    """Дата "сегодня" по часовому поясу пользователя"""
+    return moment.astimezone(get_zone(notification_settings.timezone)).date()
+
+
+def _preload_meal_plans(user_dates):
+    """Планы питания для пар (user_id, дата), сгруппированные в памяти"""
+    meal_plans = defaultdict(list)
+    if not user_dates:
+        return meal_plans
+
+    user_ids = sorted({user_id for user_id, _ in user_dates})
+    dates = {day for _, day in user_dates}
+    wanted = set(user_dates)
+
+    # Режем список id на пачки, чтобы не упереться в лимит параметров SQL
+    for i in range(0, len(user_ids), PRELOAD_BATCH_SIZE):
+        plans = UserMealPlan.objects.filter(
+            user_id__in=user_ids[i:i + PRELOAD_BATCH_SIZE],
+            date__in=dates
+        ).select_related('recipe')
+
+        for plan in plans:
+            key = (plan.user_id, plan.date)
+            if key in wanted:
+                meal_plans[key].append(plan)
+
+    return meal_plans
+
+
+def _morning_messages(keys):
+    """Тексты утренних напоминаний для пар (user_id, дата).
+
+    Готовые меню берем из кэша, планы для остальных предзагружаем
+    одним запросом на пачку и кладем отрисованные тексты в кэш.
+    """
+    messages = get_cached_menus('daily', keys)
+
+    missing = [key for key in keys if key not in messages]
+    meal_plans = _preload_meal_plans(missing)
+    rendered = {
+        (user_id, today): build_morning_reminder_message(
+            meal_plans.get((user_id, today), []), today)
+        for user_id, today in missing
+    }
+    cache_menus('daily', rendered)
 
-        await send_telegram_message_async(telegram_user.chat_id, message)
-        print(
-            f"✅ Вечернее уведомление отправлено для {telegram_user.user.username}")
+    messages.update(rendered)
+    return messages
 
-    except Exception as e:
-        print(f"❌ Ошибка отправки вечернего уведомления: {e}")
 
+def _due_shards(bucket, shard_size):
+    """Номера шардов, в которых есть наступившие напоминания (одним запросом)"""
+    return set(
+        UserNotificationSettings.objects
+        .filter(Q(next_morning_at__lte=bucket) | Q(next_evening_at__lte=bucket))
+        .annotate(shard=F('user_id') / shard_size)
+        .values_list('shard', flat=True)
+        .distinct()
+    )
 
-async def send_telegram_message_async(chat_id, message):
-    """Асинхронная отправка сообщения в Telegram"""
-    try:
-        await application.bot.send_message(
-            chat_id=chat_id,
-            text=message,
-            parse_mode='Markdown'
+
+def _send_deferred_messages():
+    """Досылаем сообщения, отложенные прошлыми тиками (режим direct)"""
+    from telegram_bot.dispatcher import send_messages
+    from telegram_bot.sender import as_message, claim_batch, claim_size, delete_messages
+
+    # send_messages начинает с полной скорости
+    queued = claim_batch(claim_size(QUEUE_BATCH_SIZE, settings.TELEGRAM_GLOBAL_RATE_LIMIT))
+    if not queued:
+        return
+
+    sent = send_messages([as_message(row) for row in queued])
+    delete_messages(queued)
+    print(f"📨 Дослано отложенных сообщений: {sent}/{len(queued)}")
+
+
+def _next_fire_time(notification_settings, reminder_type, bucket):
+    return next_reminder_time(
+        getattr(notification_settings, f'{reminder_type}_reminder_time'),
+        notification_settings.timezone,
+        bucket
+    )
+
+
+def _schedule_new_reminders(bucket):
+    """Назначаем время напоминаний новым настройкам и тем, где сменили время или пояс"""
+    pending = list(
+        UserNotificationSettings.objects.filter(
+            Q(next_morning_at__isnull=True) | Q(next_evening_at__isnull=True)
         )
-        print(f"✅ Сообщение отправлено в {chat_id}")
-    except Exception as e:
-        print(f"❌ Ошибка отправки в {chat_id}: {e}")
+    )
+
+    for notification_settings in pending:
+        for reminder_type in REMINDER_TYPES:
+            field = f'next_{reminder_type}_at'
+            if getattr(notification_settings, field) is None:
+                setattr(notification_settings, field, _next_fire_time(
+                    notification_settings, reminder_type, bucket))
+
+    UserNotificationSettings.objects.bulk_update(
+        pending, ['next_morning_at', 'next_evening_at'], batch_size=1000)
+
+
+def _claim_due_reminders(bucket, first_user_id, last_user_id):
+    """Выбираем наступившие напоминания шарда одним запросом по индексам
+    и переносим их на следующий раз.
+
+    Вызывается внутри транзакции шарда: если дальше что-то упадет,
+    перенос откатится вместе с журналом отправок.
+    Возвращает тройки (настройки, тип напоминания, минутная корзина напоминания).
+    """
+    due_settings = list(
+        UserNotificationSettings.objects
+        .select_for_update(skip_locked=True, of=('self',))
+        .filter(user_id__gte=first_user_id, user_id__lt=last_user_id)
+        .filter(Q(next_morning_at__lte=bucket) | Q(next_evening_at__lte=bucket))
+        .select_related('user', 'user__telegram')
+    )
+
+    claimed = []
+    for notification_settings in due_settings:
+        for reminder_type in REMINDER_TYPES:
+            field = f'next_{reminder_type}_at'
+            due_at = getattr(notification_settings, field)
+
+            if due_at is not None and due_at <= bucket:
+                claimed.append(
+                    (notification_settings, reminder_type, due_at))
+                setattr(notification_settings, field, _next_fire_time(
+                    notification_settings, reminder_type, bucket))
+
+    UserNotificationSettings.objects.bulk_update(
+        due_settings, ['next_morning_at', 'next_evening_at'], batch_size=1000)
+
+    return claimed
+
+
+def build_morning_reminder_message(meal_plans, today):
+    """Текст утреннего напоминания по заранее загруженным планам питания"""
+    if meal_plans:
+        # Если есть план - показываем его
+        return generate_daily_menu_message(meal_plans, today)
+
+    # Если плана нет - напоминаем составить
+    return (
+        f"🌅 *Доброе утро!*\n\n"
+        f"На {today.strftime('%d.%m.%Y')} у вас нет плана питания.\n\n"
+        f"Составьте план на день для достижения ваших целей! 💪\n\n"
+        f"*Команды бота:*\n"
+        f"/menu - Посмотреть меню\n"
+        f"/notifications - Настройки уведомлений"
+    )
 
 
 def generate_daily_menu_message(meal_plans, date):
@@ -163,65 +544,3 @@ def generate_daily_menu_message(meal_plans, date):
     message += "*Команды:* /menu - обновить, /notifications - настройки"
 
     return message
-
-
-async def send_telegram_message_async(chat_id, message):
-    """Асинхронная отправка сообщения в Telegram"""
-    try:
-        await application.bot.send_message(
-            chat_id=chat_id,
-            text=message,
-            parse_mode='Markdown'
-        )
-        print(f"✅ Сообщение отправлено в {chat_id}")
-    except Exception as e:
-        print(f"❌ Ошибка отправки в {chat_id}: {e}")
-
-
-@shared_task
-def check_all_reminders():
-    """Проверяем и отправляем все уведомления"""
-    print("🎯 Celery: НАЧАЛО ПРОВЕРКИ УВЕДОМЛЕНИЙ")
-
-    telegram_users = TelegramUser.objects.select_related(
-        'user', 'user__notification_settings'
-    ).all()
-
-    print(f"🔍 ВСЕГО Telegram пользователей в базе: {telegram_users.count()}")
-
-    active_users = 0
-    for telegram_user in telegram_users:
-        try:
-            print(
-                f"👤 Проверяем: {telegram_user.user.username} (ID: {telegram_user.telegram_id})")
-
-            settings = telegram_user.user.notification_settings
-
-            if not settings.is_subscribed:
-                print("   ⏭️  Пропускаем - уведомления выключены")
-                continue
-
-            active_users += 1
-
-            # Утреннее напоминание
-            morning_time = is_reminder_time(telegram_user.user, 'morning')
-            print(f"   🌅 Утреннее время: {morning_time}")
-
-            if morning_time and settings.send_morning_reminder:
-                print(f"   📨 ОТПРАВЛЯЕМ УТРЕННЕЕ УВЕДОМЛЕНИЕ!")
-                asyncio.run(send_morning_reminder_async(telegram_user))
-
-            # Вечернее напоминание
-            evening_time = is_reminder_time(telegram_user.user, 'evening')
-            print(f"   🌙 Вечернее время: {evening_time}")
-
-            if evening_time and settings.send_evening_reminder:
-                print(f"   📨 ОТПРАВЛЯЕМ ВЕЧЕРНЕЕ УВЕДОМЛЕНИЕ!")
-                asyncio.run(send_evening_reminder_async(telegram_user))
-
-        except Exception as e:
-            print(f"❌ Ошибка у {telegram_user.user.username}: {e}")
-
-    print(f"✅ ПРОВЕРКА ЗАВЕРШЕНА. Активных пользователей: {active_users}")
-
-
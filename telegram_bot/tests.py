@@ -1,3 +1,503 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import date, datetime, time as local_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from telegram.error import BadRequest, NetworkError, RetryAfter
+from django.utils import timezone
+from nutrition_app.models import (
+    CustomUser, Recipe, ReminderDelivery, TelegramUser, UserMealPlan, UserNotificationSettings,
+    UserProfile)
+from nutrition_app.tests import QueryBudgetMixin, create_catalog, create_week_of_meal_plans
+from telegram_bot.cache import (
+    TTLCache, _telegram_ids, identity_cache, recent_taps, rendered_messages)
+from telegram_bot.dispatcher import DEFERRED, FAILED, SENT, RateLimiter, TokenBucket, _send_one
+from telegram_bot.fake_telegram import make_command_update
+from telegram_bot.handlers import handle_all_buttons, help_command, main_menu
+from telegram_bot.models import OutgoingMessage
+from telegram_bot.sender import claim_batch, claim_size, enqueue_messages
+from telegram_bot.tasks import (
+    _claim_slots, _weekly_totals, check_all_reminders, send_weekly_reports)
+from telegram_bot.time_utils import minute_bucket, next_reminder_time
+from telegram_bot.utils import generate_personal_menu_message, get_user_meal_plan_for_date
 
-# Create your tests here.
+# Пользователей в волне напоминаний (под это число посчитан бюджет check_all_reminders)
+REMINDER_USERS = 60
+
+# Отдельный кэш меню и без файлов метрик: тесты не трогают общие данные
+TEST_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'TELEGRAM_MENU_CACHE_TTL': 60,
+    'TELEGRAM_METRICS_DIR': '',
+    'TELEGRAM_REMINDER_DELIVERY': 'queue',
+}
+
+
+def create_reminder_users(count):
+    """Пользователи с привязанным Telegram и настройками уведомлений по умолчанию"""
+    users = CustomUser.objects.bulk_create([
+        CustomUser(username=f'reminder_user_{number}') for number in range(count)
+    ])
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+    TelegramUser.objects.bulk_create([
+        TelegramUser(user=user, telegram_id=10 ** 9 + number, chat_id=10 ** 9 + number)
+        for number, user in enumerate(users)
+    ])
+    UserNotificationSettings.objects.bulk_create([
+        UserNotificationSettings(user=user) for user in users
+    ])
+    return users
+
+
+def make_morning_due():
+    """Утреннее напоминание всех пользователей наступило минуту назад; возвращает слот"""
+    slot = minute_bucket(timezone.now()) - timedelta(minutes=1)
+    UserNotificationSettings.objects.update(next_morning_at=slot)
+    return slot
+
+
+@override_settings(**TEST_SETTINGS)
+class BotQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Помощники бота и рассылка напоминаний не делают запросов на каждый прием пищи"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.today = timezone.localdate()
+
+        users = create_reminder_users(REMINDER_USERS)
+        for user in users[:10]:
+            create_week_of_meal_plans(user, cls.today)
+
+        cls.user = users[0]
+
+    def test_get_user_meal_plan_for_date(self):
+        meals, total_calories, *_ = self.assertWithinBudget(
+            'get_user_meal_plan_for_date', get_user_meal_plan_for_date, self.user, self.today)
+        self.assertEqual(len(meals), 4)
+        self.assertGreater(total_calories, 0)
+
+    def test_generate_personal_menu_message(self):
+        tomorrow = self.today + timedelta(days=1)
+        message = self.assertWithinBudget(
+            'generate_personal_menu_message',
+            generate_personal_menu_message, self.user.id, tomorrow)
+
+        # Повторный вызов - из кэша меню
+        cached = self.assertWithinBudget(
+            'generate_personal_menu_message_cached',
+            generate_personal_menu_message, self.user.id, tomorrow)
+        self.assertEqual(cached, message)
+
+    def test_check_all_reminders(self):
+        make_morning_due()
+
+        self.assertWithinBudget('check_all_reminders', check_all_reminders)
+        self.assertEqual(OutgoingMessage.objects.count(), REMINDER_USERS)
+
+
+@override_settings(**TEST_SETTINGS)
+class ReminderDeliveryTests(TestCase):
+    """Каждое напоминание уходит ровно один раз, даже при сбоях и повторных тиках"""
+
+    USERS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        create_reminder_users(cls.USERS)
+
+    def test_failed_shard_is_retried_on_next_tick(self):
+        slot = make_morning_due()
+
+        # Шард падает уже после того, как забрал напоминания
+        with mock.patch('telegram_bot.tasks._morning_messages', side_effect=RuntimeError):
+            check_all_reminders()
+
+        self.assertFalse(OutgoingMessage.objects.exists())
+        self.assertFalse(ReminderDelivery.objects.exists())
+        self.assertEqual(
+            UserNotificationSettings.objects.filter(next_morning_at=slot).count(), self.USERS)
+
+        check_all_reminders()
+        self.assertEqual(OutgoingMessage.objects.count(), self.USERS)
+        self.assertFalse(UserNotificationSettings.objects.filter(next_morning_at=slot).exists())
+
+    def test_repeated_tick_for_same_slot_sends_once(self):
+        slot = make_morning_due()
+        check_all_reminders()
+
+        # Второй воркер или ретрай видит тот же слот еще наступившим
+        UserNotificationSettings.objects.update(next_morning_at=slot)
+        check_all_reminders()
+
+        self.assertEqual(OutgoingMessage.objects.count(), self.USERS)
+        self.assertEqual(
+            ReminderDelivery.objects.filter(reminder_type='morning', slot=slot).count(),
+            self.USERS)
+
+    def test_claim_slots_returns_only_newly_claimed(self):
+        slot = minute_bucket(timezone.now())
+        user_ids = list(CustomUser.objects.values_list('id', flat=True))
+        first = [(user_id, 'morning', slot) for user_id in user_ids[:3]]
+        second = [(user_id, 'morning', slot) for user_id in user_ids]
+
+        self.assertEqual(_claim_slots(first), set(first))
+        # Уже записанные слоты достались первому вызову, второй получает только новые
+        self.assertEqual(_claim_slots(second), set(second) - set(first))
+        self.assertEqual(_claim_slots(second), set())
+
+
+@override_settings(**TEST_SETTINGS)
+class WeeklyReportTests(TestCase):
+    """Недельные итоги всех подписчиков считает один сгруппированный запрос"""
+
+    WEEK_START = date(2026, 10, 12)
+    WEEK_END = date(2026, 10, 18)
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.breakfast = Recipe.objects.filter(meal_type='breakfast').first()
+        cls.dinner = Recipe.objects.filter(meal_type='dinner').first()
+
+        cls.first, cls.second, cls.unsubscribed = create_reminder_users(3)
+        UserNotificationSettings.objects.filter(user=cls.unsubscribed).update(is_subscribed=False)
+
+        monday, tuesday = cls.WEEK_START, cls.WEEK_START + timedelta(days=1)
+        plans = [
+            # Два приема пищи в один день - один день в отчете
+            (cls.first, monday, cls.breakfast, '1.5'),
+            (cls.first, monday, cls.dinner, '0.5'),
+            (cls.first, tuesday, cls.breakfast, '1.0'),
+            # Воскресенье прошлой недели в итоги не входит
+            (cls.first, monday - timedelta(days=1), cls.dinner, '1.0'),
+            (cls.second, tuesday, cls.dinner, '2.0'),
+            (cls.unsubscribed, monday, cls.breakfast, '1.0'),
+        ]
+        UserMealPlan.objects.bulk_create([
+            UserMealPlan(
+                user=user, date=day, meal_type=recipe.meal_type, recipe=recipe,
+                portion_multiplier=Decimal(multiplier))
+            for user, day, recipe, multiplier in plans
+        ])
+
+    def test_totals_are_grouped_per_subscriber(self):
+        with self.assertNumQueries(1):
+            totals = {row['user_id']: row for row in _weekly_totals(self.WEEK_START, self.WEEK_END)}
+
+        self.assertEqual(set(totals), {self.first.id, self.second.id})
+
+        first = totals[self.first.id]
+        self.assertEqual(first['days'], 2)
+        self.assertAlmostEqual(
+            first['calories'], self.breakfast.calories * 2.5 + self.dinner.calories * 0.5)
+        protein = self.breakfast.protein * Decimal('2.5') + self.dinner.protein * Decimal('0.5')
+        self.assertAlmostEqual(first['protein'], float(protein), places=2)
+        self.assertEqual(first['user__telegram__chat_id'], self.first.telegram.chat_id)
+
+        second = totals[self.second.id]
+        self.assertEqual(second['days'], 1)
+        self.assertAlmostEqual(second['calories'], self.dinner.calories * 2)
+
+    def test_reports_are_queued_once_for_subscribers(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=self.WEEK_END):
+            send_weekly_reports()
+            send_weekly_reports()
+
+        self.assertCountEqual(
+            OutgoingMessage.objects.values_list('chat_id', flat=True),
+            [self.first.telegram.chat_id, self.second.telegram.chat_id])
+        self.assertIn('Дней с планом питания: 2 из 7', OutgoingMessage.objects.get(
+            chat_id=self.first.telegram.chat_id).text)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class ReminderScheduleTests(TestCase):
+    """Локальное время напоминания в поясе пользователя -> минутная корзина в UTC"""
+
+    def test_minute_bucket_is_utc_minute(self):
+        moment = datetime(2026, 1, 10, 9, 30, 45, 123, tzinfo=dt_timezone(timedelta(hours=3)))
+        self.assertEqual(minute_bucket(moment), utc(2026, 1, 10, 6, 30))
+
+    def test_time_in_non_utc_zone(self):
+        # 05:00 в Токио (UTC+9): утреннее 08:00 еще впереди, в UTC это предыдущий день
+        self.assertEqual(
+            next_reminder_time(local_time(8, 0), 'Asia/Tokyo', utc(2026, 1, 10, 20, 0)),
+            utc(2026, 1, 10, 23, 0))
+
+    def test_passed_time_rolls_to_tomorrow(self):
+        # 09:00 в Токио: сегодняшнее 08:00 прошло
+        self.assertEqual(
+            next_reminder_time(local_time(8, 0), 'Asia/Tokyo', utc(2026, 1, 10, 0, 0)),
+            utc(2026, 1, 10, 23, 0))
+        # Ровно в момент напоминания - тоже на завтра: корзина строго позже after
+        self.assertEqual(
+            next_reminder_time(local_time(8, 0), 'Asia/Tokyo', utc(2026, 1, 9, 23, 0)),
+            utc(2026, 1, 10, 23, 0))
+
+    def test_dst_transition_keeps_local_time(self):
+        # В Берлине 29.03.2026 переход на летнее время: UTC+1 -> UTC+2
+        self.assertEqual(
+            next_reminder_time(local_time(8, 0), 'Europe/Berlin', utc(2026, 3, 27, 8, 0)),
+            utc(2026, 3, 28, 7, 0))
+        self.assertEqual(
+            next_reminder_time(local_time(8, 0), 'Europe/Berlin', utc(2026, 3, 28, 8, 0)),
+            utc(2026, 3, 29, 6, 0))
+
+    def test_unknown_zone_falls_back_to_project_zone(self):
+        after = utc(2026, 1, 10, 0, 0)
+        self.assertEqual(
+            next_reminder_time(local_time(8, 0), 'Mars/Olympus_Mons', after),
+            next_reminder_time(local_time(8, 0), settings.TIME_ZONE, after))
+
+    def test_schedule_change_clears_next_fire_times(self):
+        user = create_reminder_users(1)[0]
+        make_morning_due()
+        UserNotificationSettings.objects.update(next_evening_at=timezone.now())
+
+        notification_settings = UserNotificationSettings.objects.get(user=user)
+        notification_settings.is_subscribed = False
+        notification_settings.save(update_fields=['is_subscribed'])
+        notification_settings.refresh_from_db()
+        # Время и пояс не менялись - расписание остается
+        self.assertIsNotNone(notification_settings.next_morning_at)
+
+        notification_settings.timezone = 'Asia/Tokyo'
+        notification_settings.save(update_fields=['timezone'])
+        notification_settings.refresh_from_db()
+        self.assertIsNone(notification_settings.next_morning_at)
+        self.assertIsNone(notification_settings.next_evening_at)
+
+
+class IdentityCacheTests(TestCase):
+    """Кэши бота ограничены по размеру и сбрасываются при изменении настроек"""
+
+    def tearDown(self):
+        identity_cache.clear()
+        _telegram_ids.clear()
+
+    def test_ttl_cache_evicts_least_recently_used_and_expired(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+        with mock.patch('telegram_bot.cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get('a'))
+
+    def test_settings_change_drops_cached_identity(self):
+        user = create_reminder_users(1)[0]
+        telegram_id = user.telegram.telegram_id
+        identity_cache.set(telegram_id, {'user_id': user.id, 'chat_id': telegram_id})
+        _telegram_ids.set(user.id, telegram_id)
+
+        UserNotificationSettings.objects.get(user=user).save()
+
+        self.assertIsNone(identity_cache.get(telegram_id))
+        self.assertIsNone(_telegram_ids.get(user.id))
+
+
+def make_button_update(data, user_id=1, message_id=10):
+    """Нажатие кнопки под сообщением бота: answer и edit_message_text - моки"""
+    query = SimpleNamespace(
+        data=data,
+        message=SimpleNamespace(chat_id=user_id, message_id=message_id),
+        answer=mock.AsyncMock(),
+        edit_message_text=mock.AsyncMock(),
+    )
+    return SimpleNamespace(
+        callback_query=query, message=None, effective_user=SimpleNamespace(id=user_id))
+
+
+class ButtonTapTests(SimpleTestCase):
+    """Повторные нажатия и неизменившиеся экраны не стоят запросов к Telegram"""
+
+    def tearDown(self):
+        rendered_messages.clear()
+        recent_taps.clear()
+
+    async def test_identical_render_skips_edit(self):
+        update = make_button_update('main_menu')
+        await main_menu(update, None)
+        await main_menu(update, None)
+        self.assertEqual(update.callback_query.edit_message_text.await_count, 1)
+
+        # Другой экран в том же сообщении редактируется
+        await help_command(update, None)
+        self.assertEqual(update.callback_query.edit_message_text.await_count, 2)
+
+    async def test_not_modified_error_is_ignored(self):
+        update = make_button_update('main_menu')
+        update.callback_query.edit_message_text.side_effect = BadRequest(
+            'Message is not modified: specified new message content is the same')
+
+        await main_menu(update, None)
+        self.assertEqual(update.callback_query.edit_message_text.await_count, 1)
+
+    async def test_repeated_tap_inside_debounce_window_is_dropped(self):
+        update = make_button_update('main_menu')
+        await handle_all_buttons(update, None)
+        # Без кэша отрисовки второе нажатие может отбросить только debounce
+        rendered_messages.clear()
+        await handle_all_buttons(update, None)
+
+        # На каждое нажатие Telegram ждет ответа, даже на отброшенное
+        self.assertEqual(update.callback_query.answer.await_count, 2)
+        self.assertEqual(update.callback_query.edit_message_text.await_count, 1)
+
+        # Та же кнопка у другого пользователя обрабатывается
+        other = make_button_update('main_menu', user_id=2)
+        await handle_all_buttons(other, None)
+        self.assertEqual(other.callback_query.edit_message_text.await_count, 1)
+
+    async def test_tap_after_debounce_window_is_handled(self):
+        update = make_button_update('main_menu')
+        await handle_all_buttons(update, None)
+        rendered_messages.clear()
+
+        later = time.monotonic() + settings.TELEGRAM_BUTTON_DEBOUNCE + 1
+        with mock.patch('telegram_bot.cache.time.monotonic', return_value=later):
+            await handle_all_buttons(update, None)
+        self.assertEqual(update.callback_query.edit_message_text.await_count, 2)
+
+
+class FakeBot:
+    """Bot, который отвечает заранее заданными ошибками, а потом успехом"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def send_message(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+@override_settings(
+    TELEGRAM_METRICS_DIR='',
+    TELEGRAM_SEND_MAX_INLINE_DELAY=5,
+    TELEGRAM_SEND_MAX_ATTEMPTS=3,
+    TELEGRAM_SEND_BACKOFF_BASE=0,
+)
+class DispatcherTests(SimpleTestCase):
+    """Флуд-контроль и повторы при отправке одного сообщения"""
+
+    MESSAGE = {'chat_id': 1, 'text': 'Привет'}
+
+    def send(self, bot, limiter=None):
+        limiter = limiter or RateLimiter(30, 1)
+
+        async def run():
+            return await _send_one(bot, asyncio.Semaphore(1), limiter, self.MESSAGE)
+
+        return asyncio.run(run())
+
+    def test_short_retry_after_is_waited_inline(self):
+        bot = FakeBot(RetryAfter(timedelta(milliseconds=50)))
+        result = self.send(bot)
+
+        self.assertEqual(result['status'], SENT)
+        self.assertEqual(bot.calls, 2)
+        # 429 - не вина сообщения: попытка не считается
+        self.assertEqual(result['attempts'], 1)
+
+    def test_long_retry_after_defers_and_slows_down(self):
+        limiter = RateLimiter(30, 1)
+        result = self.send(FakeBot(RetryAfter(30)), limiter)
+
+        self.assertEqual(result['status'], DEFERRED)
+        self.assertEqual(result['delay'], 30)
+        self.assertEqual(result['attempts'], 0)
+        self.assertEqual(limiter.global_bucket.rate, 15)
+        self.assertGreater(limiter.blocked_for(self.MESSAGE['chat_id']), 25)
+
+    def test_network_errors_are_retried_up_to_max_attempts(self):
+        bot = FakeBot(*[NetworkError('timeout')] * 5)
+        result = self.send(bot)
+
+        self.assertEqual(result['status'], FAILED)
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual(bot.calls, 3)
+
+    def test_permanent_error_is_not_retried(self):
+        bot = FakeBot(BadRequest('Chat not found'))
+        result = self.send(bot)
+
+        self.assertEqual(result['status'], FAILED)
+        self.assertEqual(bot.calls, 1)
+
+    def test_blocked_bucket_refuses_beyond_max_block(self):
+        bucket = TokenBucket(rate=10)
+        bucket.block(30)
+
+        self.assertFalse(asyncio.run(bucket.acquire(max_block=5)))
+
+
+@override_settings(TELEGRAM_SENDER_LEASE=60, TELEGRAM_SENDER_LEASE_MARGIN=20)
+class SenderQueueTests(TestCase):
+    """Очередь демона отправки: аренда взятых сообщений и размер пачки"""
+
+    def test_claimed_messages_return_after_lease_expires(self):
+        enqueue_messages([{'chat_id': number, 'text': 'Привет'} for number in range(3)])
+
+        self.assertEqual(len(claim_batch(10)), 3)
+        # Пока аренда действует, второй демон эти сообщения не получит
+        self.assertEqual(claim_batch(10), [])
+
+        # Демон упал, не отправив пачку: после аренды сообщения снова доступны
+        expired = timezone.now() + timedelta(seconds=61)
+        with mock.patch('django.utils.timezone.now', return_value=expired):
+            self.assertEqual(len(claim_batch(10)), 3)
+
+    def test_claim_fits_lease_at_current_rate(self):
+        # 40 секунд аренды на отправку
+        self.assertEqual(claim_size(500, 30), 500)
+        self.assertEqual(claim_size(500, 7.5), 300)
+        self.assertEqual(claim_size(500, 1), 40)
+        self.assertEqual(claim_size(500, 0.01), 1)
+
+
+@override_settings(TELEGRAM_WEBHOOK_SECRET='webhook-secret')
+class WebhookSecretTests(SimpleTestCase):
+    """Вебхук принимает обновления только с секретом из setWebhook"""
+
+    def post(self, **headers):
+        return self.async_client.post(
+            reverse('telegram_webhook'), make_command_update(1, 1, '/start'),
+            content_type='application/json', headers=headers)
+
+    async def test_missing_secret_is_forbidden(self):
+        response = await self.post()
+        self.assertEqual(response.status_code, 403)
+
+    async def test_wrong_secret_is_forbidden(self):
+        response = await self.post(**{'X-Telegram-Bot-Api-Secret-Token': 'wrong'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_non_ascii_secret_is_forbidden(self):
+        response = await self.post(**{'X-Telegram-Bot-Api-Secret-Token': 'sécret'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_correct_secret_queues_update(self):
+        application = SimpleNamespace(update_queue=asyncio.Queue(), bot=None)
+        with mock.patch('telegram_bot.views._ensure_started'), \
+                mock.patch('telegram_bot.views.get_application', return_value=application):
+            response = await self.post(**{'X-Telegram-Bot-Api-Secret-Token': 'webhook-secret'})
+
+        self.assertEqual(response.status_code, 200)
+        update = application.update_queue.get_nowait()
+        self.assertEqual(update.message.text, '/start')
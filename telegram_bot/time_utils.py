@@ -1,31 +1,38 @@
-from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
 
 
-def is_reminder_time(user, reminder_type='morning'):
-    """Проверка времени уведомлений - РАЗНЫЕ минуты для тестирования"""
+@lru_cache(maxsize=None)
+def get_zone(tz_name):
+    """Часовой пояс по имени IANA (разбираем каждый пояс один раз)"""
     try:
-        settings = user.notification_settings
-
-        if not settings.is_subscribed:
-            return False
-
-        if reminder_type == 'morning' and not settings.send_morning_reminder:
-            return False
-        if reminder_type == 'evening' and not settings.send_evening_reminder:
-            return False
-
-        # РАЗНЫЕ МИНУТЫ для тестирования:
-        current_time = timezone.now()
-        current_minute = current_time.minute
-
-        if reminder_type == 'morning':
-            # Утренние: каждая ЧЕТНАЯ минута (0, 2, 4, 6...)
-            return current_minute % 2 == 0
-        else:  # evening
-            # Вечерние: каждая НЕЧЕТНАЯ минута (1, 3, 5, 7...)
-            return current_minute % 2 == 1
-
-    except Exception as e:
-        print(f"Error in is_reminder_time: {e}")
-        return False
+        return ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def minute_bucket(moment):
+    """Минутная корзина в UTC, к которой относится момент времени"""
+    return moment.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+
+
+@lru_cache(maxsize=4096)
+def next_reminder_time(reminder_time, tz_name, after):
+    """Ближайшая минутная корзина напоминания строго позже after.
+
+    reminder_time - локальное время пользователя, tz_name - его часовой пояс.
+    За один тик after одинаков для всех, поэтому пользователи с одинаковыми
+    временем и поясом считаются один раз.
+    """
+    zone = get_zone(tz_name)
+    local_date = after.astimezone(zone).date()
+
+    candidate = datetime.combine(local_date, reminder_time, tzinfo=zone)
+    if candidate <= after:
+        candidate = datetime.combine(
+            local_date + timedelta(days=1), reminder_time, tzinfo=zone)
+
+    return minute_bucket(candidate)
+
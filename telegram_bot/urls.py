@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import metrics_view, telegram_webhook
+
+urlpatterns = [
+    path('webhook/', telegram_webhook, name='telegram_webhook'),
+    path('metrics/', metrics_view, name='telegram_metrics'),
+]
@@ -1,123 +1,90 @@
 from django.utils import timezone
 from datetime import datetime, date
-from nutrition_app.models import UserMealPlan, CustomUser
+from nutrition_app.models import UserMealPlan
 from nutrition_app.views.utils import _adjust_portion
-from asgiref.sync import sync_to_async
-
-
-@sync_to_async
-def get_user_meal_plan_for_date_async(user, target_date):
-    """Асинхронная версия получения плана питания"""
-    return get_user_meal_plan_for_date(user, target_date)
-
-
-@sync_to_async
-def get_first_user_async():
-    """Асинхронная версия получения первого пользователя"""
-    return CustomUser.objects.first()
+from telegram_bot.cache import get_or_render_menu
+from telegram_bot.db import db_sync_to_async
 
 
 def get_user_meal_plan_for_date(user, target_date):
     """Получаем индивидуальный план питания пользователя на дату"""
     try:
-        meal_plans = UserMealPlan.objects.filter(
-            user=user,
-            date=target_date
-        ).select_related('recipe')
-
-        result = []
-        total_calories = 0
-        total_protein = 0
-        total_fat = 0
-        total_carbs = 0
-
-        for plan in meal_plans:
-            # Применяем корректировку порции к рецепту
-            if plan.portion_multiplier != 1.0:
-                adjusted_recipe = _adjust_portion(
-                    plan.recipe, float(plan.portion_multiplier))
-                calories = adjusted_recipe.calories
-                protein = float(adjusted_recipe.protein)
-                fat = float(adjusted_recipe.fat)
-                carbs = float(adjusted_recipe.carbs)
-                description = f"{adjusted_recipe.name} ({plan.portion_multiplier} порц.)"
-            else:
-                calories = plan.recipe.calories
-                protein = float(plan.recipe.protein)
-                fat = float(plan.recipe.fat)
-                carbs = float(plan.recipe.carbs)
-                description = plan.recipe.name
-
-            result.append({
-                'meal_type': plan.meal_type,
-                'description': description,
-                'calories': calories,
-                'protein': protein,
-                'fat': fat,
-                'carbs': carbs,
-                'recipe': plan.recipe
-            })
-
-            total_calories += calories
-            total_protein += protein
-            total_fat += fat
-            total_carbs += carbs
-
-        return result, total_calories, total_protein, total_fat, total_carbs
-
+        return _load_meal_plan_for_date(user, target_date)
     except Exception as e:
         print(f"Error getting user meal plan: {e}")
         return [], 0, 0, 0, 0
 
 
-async def generate_personal_menu_message_async(user, target_date):
+def _load_meal_plan_for_date(user, target_date):
+    meal_plans = UserMealPlan.objects.filter(
+        user=user,
+        date=target_date
+    ).select_related('recipe')
+
+    result = []
+    total_calories = 0
+    total_protein = 0
+    total_fat = 0
+    total_carbs = 0
+
+    for plan in meal_plans:
+        # Применяем корректировку порции к рецепту
+        if plan.portion_multiplier != 1.0:
+            adjusted_recipe = _adjust_portion(
+                plan.recipe, float(plan.portion_multiplier))
+            calories = adjusted_recipe.calories
+            protein = float(adjusted_recipe.protein)
+            fat = float(adjusted_recipe.fat)
+            carbs = float(adjusted_recipe.carbs)
+            description = f"{adjusted_recipe.name} ({plan.portion_multiplier} порц.)"
+        else:
+            calories = plan.recipe.calories
+            protein = float(plan.recipe.protein)
+            fat = float(plan.recipe.fat)
+            carbs = float(plan.recipe.carbs)
+            description = plan.recipe.name
+
+        result.append({
+            'meal_type': plan.meal_type,
+            'description': description,
+            'calories': calories,
+            'protein': protein,
+            'fat': fat,
+            'carbs': carbs,
+            'recipe': plan.recipe
+        })
+
+        total_calories += calories
+        total_protein += protein
+        total_fat += fat
+        total_carbs += carbs
+
+    return result, total_calories, total_protein, total_fat, total_carbs
+
+
+@db_sync_to_async
+def generate_personal_menu_message_async(user, target_date):
     """Асинхронная версия генерации меню"""
-    meal_entries, total_calories, total_protein, total_fat, total_carbs = await get_user_meal_plan_for_date_async(user, target_date)
-
-    if not meal_entries:
-        return f"🍽️ На {target_date.strftime('%d.%m.%Y')} у вас нет плана питания.\n\nЗайдите на сайт чтобы составить персональный план!"
-
-    message = f"🍽️ Ваше персональное меню на {target_date.strftime('%d.%m.%Y')}:\n\n"
-
-    meal_types = {
-        'breakfast': '🥣 Завтрак',
-        'lunch': '🍗 Обед',
-        'dinner': '🐟 Ужин',
-        'snack': '🍎 Перекус'
-    }
-
-    # Группируем по приемам пищи для красивого отображения
-    meals_dict = {}
-    for entry in meal_entries:
-        if entry['meal_type'] not in meals_dict:
-            meals_dict[entry['meal_type']] = []
-        meals_dict[entry['meal_type']].append(entry)
-
-    # Выводим по порядку приемов пищи
-    for meal_type in ['breakfast', 'lunch', 'snack', 'dinner']:
-        if meal_type in meals_dict:
-            meal_name = meal_types.get(meal_type, '📝 Прием пищи')
-            message += f"**{meal_name}:**\n"
-
-            for entry in meals_dict[meal_type]:
-                message += f"• {entry['description']} - {entry['calories']} ккал\n"
-
-            message += "\n"
-
-    # Итоги за день
-    message += f"📊 **Итого за день:**\n"
-    message += f"• Калории: {total_calories} ккал\n"
-    message += f"• Белки: {total_protein:.1f}г\n"
-    message += f"• Жиры: {total_fat:.1f}г\n"
-    message += f"• Углеводы: {total_carbs:.1f}г\n\n"
-    message += "💡 Чтобы изменить план питания, зайдите на сайт"
-
-    return message
+    return generate_personal_menu_message(user, target_date)
 
 
 def generate_personal_menu_message(user, target_date):
-    """Генерирует сообщение с персональным меню пользователя"""
-    meal_entries, total_calories, total_protein, total_fat, total_carbs = get_user_meal_plan_for_date(
+    """Генерирует сообщение с персональным меню пользователя.
+
+    user - пользователь или его id. Готовый текст берется из кэша,
+    который сбрасывается при изменении планов питания и рецептов.
+    """
+    return get_or_render_menu(
+        'personal',
+        getattr(user, 'pk', user),
+        target_date,
+        lambda: _render_personal_menu_message(user, target_date)
+    )
+
+
+def _render_personal_menu_message(user, target_date):
+    # Ошибку загрузки не глушим, чтобы пустое меню не попало в кэш
+    meal_entries, total_calories, total_protein, total_fat, total_carbs = _load_meal_plan_for_date(
         user, target_date)
 
     if not meal_entries:
@@ -1,5 +1,69 @@
-from django.shortcuts import render
-from django.http import JsonResponse
+import asyncio
+import json
+from hmac import compare_digest
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from .bot import bot  
-from . import handlers
+from django.views.decorators.http import require_POST
+from . import metrics
+from .bot import get_application
+
+_startup_lock = asyncio.Lock()
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+
+async def _ensure_started():
+    """Запускаем Application в event loop ASGI-сервера при первом обновлении"""
+    async with _startup_lock:
+        application = get_application()
+        if not application.running:
+            await application.initialize()
+            await application.start()
+
+
+@csrf_exempt
+@require_POST
+async def telegram_webhook(request):
+    """Прием обновлений от Telegram в режиме webhook.
+
+    Работает только под ASGI (nutrition_project.asgi): обновления обрабатываются
+    в фоне в event loop сервера, одновременно до TELEGRAM_CONCURRENT_UPDATES штук.
+    """
+    secret = settings.TELEGRAM_WEBHOOK_SECRET
+    token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not secret or not compare_digest(token.encode(), secret.encode()):
+        return HttpResponseForbidden()
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest()
+
+    from telegram import Update
+
+    await _ensure_started()
+    application = get_application()
+
+    # Отвечаем Telegram сразу, обработку делает очередь Application
+    await application.update_queue.put(Update.de_json(data, application.bot))
+    return JsonResponse({'ok': True})
+
+
+def metrics_view(request):
+    """Метрики конвейера напоминаний для Prometheus.
+
+    С TELEGRAM_METRICS_TOKEN нужен заголовок Authorization: Bearer <токен>
+    (bearer_token в scrape-конфиге Prometheus). Без токена - только
+    с этой машины; за обратным прокси на этой же машине так эндпоинт
+    открыт всем, поэтому без токена его нельзя проксировать.
+    """
+    token = settings.TELEGRAM_METRICS_TOKEN
+    if token:
+        authorization = request.headers.get('Authorization', '')
+        if not compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in LOCAL_ADDRESSES:
+        return HttpResponseForbidden()
+
+    return HttpResponse(metrics.collect(), content_type='text/plain; version=0.0.4; charset=utf-8')